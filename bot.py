@@ -16,7 +16,7 @@ from handlers import (
     start, admin, broadcast, user_settings, announcements, 
     flying_plane_handler, legacy_handlers, admin_comprehensive, 
     financial_operations, currency, addresses, requests, profile, support,
-    wallet, affiliate, admin_advanced
+    wallet, affiliate, admin_advanced, admin_agent_settings
 )
 from services.broadcast_service import BroadcastService
 
@@ -69,6 +69,7 @@ async def main(async_session):
             affiliate.router,
             admin_comprehensive.router,
             admin_advanced.router,
+            admin_agent_settings.router,
             admin.router,
             broadcast.router,
             announcements.router,
@@ -87,6 +88,10 @@ async def main(async_session):
             router.message.middleware.register(SessionMiddleware(async_session))
             router.callback_query.middleware.register(SessionMiddleware(async_session))
         
+        # Agent settings handlers receive an already-open session per update
+        admin_agent_settings.router.message.middleware.register(DbSessionMiddleware(async_session))
+        admin_agent_settings.router.callback_query.middleware.register(DbSessionMiddleware(async_session))
+        
         # Start broadcast service worker
         asyncio.create_task(broadcast_service.worker())
         logger.info("Broadcast service worker started")
@@ -113,6 +118,17 @@ class SessionMiddleware:
         data['broadcast_service'] = broadcast_service
         return await handler(event, data)
 
+class DbSessionMiddleware:
+    """Middleware to open one database session per update and inject it as `session`"""
+    
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+    
+    async def __call__(self, handler, event, data):
+        async with self.session_maker() as session:
+            data['session'] = session
+            return await handler(event, data)
+
 def get_bot():
     """Get bot instance for external use"""
     return bot_instance
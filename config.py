@@ -31,8 +31,8 @@ DATABASE_URL = os.getenv(
 )
 
 # Database pool settings
-DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
-DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "25"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "25"))
 DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
 
 # ==================== SECURITY CONFIGURATION ====================
@@ -97,6 +97,11 @@ USERS_PER_PAGE = int(os.getenv("USERS_PER_PAGE", "10"))
 ANNOUNCEMENTS_PER_PAGE = int(os.getenv("ANNOUNCEMENTS_PER_PAGE", "5"))
 TRANSACTIONS_PER_PAGE = int(os.getenv("TRANSACTIONS_PER_PAGE", "20"))
 
+# ==================== ADMIN PANEL CONFIGURATION ====================
+ADMIN_STATS_CACHE_TTL = float(os.getenv("ADMIN_STATS_CACHE_TTL", "15"))  # seconds
+ADMIN_DB_CONCURRENCY = int(os.getenv("ADMIN_DB_CONCURRENCY", "16"))  # concurrent DB-heavy admin callbacks
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "60"))  # seconds; SystemSettingsService in-memory cache
+
 # ==================== LOGGING CONFIGURATION ====================
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = os.getenv("LOG_FILE", "bot.log")
@@ -105,6 +110,7 @@ LOG_FILE = os.getenv("LOG_FILE", "bot.log")
 USER_RATE_LIMIT = int(os.getenv("USER_RATE_LIMIT", "5"))  # requests per minute
 ADMIN_RATE_LIMIT = int(os.getenv("ADMIN_RATE_LIMIT", "30"))  # requests per minute
 API_RATE_LIMIT = int(os.getenv("API_RATE_LIMIT", "100"))  # requests per minute
+CALLBACK_DEDUP_WINDOW = float(os.getenv("CALLBACK_DEDUP_WINDOW", "0.3"))  # seconds; repeat presses of the same button are dropped
 
 # ✅ Financial rate limiting
 DEPOSIT_RATE_LIMIT = int(os.getenv("DEPOSIT_RATE_LIMIT", "10"))  # requests per hour
@@ -6,26 +6,49 @@ Professional Excel Formatting System
 """
 
 import csv
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
+import re
 from datetime import datetime
 import os
 
+# ملاحظة: وحدات openpyxl تُستورد داخل الدوال التي تحتاجها حتى لا يدفع
+# استخدام calculate_statistics وحده كلفة تحميل مكتبة Excel
+
+# نمط الكشف عن الحروف العربية
+_AR_RE = re.compile('[\u0600-\u06FF]')
+
+# حجم مخزن القراءة لملفات CSV (1 ميجابايت) لتقليل استدعاءات النظام
+CSV_BUFFER_SIZE = 1 << 20
+
 class ExcelFormatter:
     def __init__(self):
-        # ألوان النظام
+        # ألوان النظام (صيغة ARGB كاملة؛ الصيغة السداسية تُقرأ بشفافية 00)
         self.colors = {
-            'primary': '1F4E79',      # أزرق داكن
-            'secondary': '2E75B6',    # أزرق متوسط
-            'success': '70AD47',      # أخضر
-            'warning': 'FFC000',      # أصفر
-            'danger': 'C5504B',       # أحمر
-            'light': 'F2F2F2',       # رمادي فاتح
-            'white': 'FFFFFF',        # أبيض
-            'text': '2D2D2D'          # نص داكن
+            'primary': 'FF1F4E79',      # أزرق داكن
+            'secondary': 'FF2E75B6',    # أزرق متوسط
+            'success': 'FF70AD47',      # أخضر
+            'warning': 'FFFFC000',      # أصفر
+            'danger': 'FFC5504B',       # أحمر
+            'light': 'FFF2F2F2',       # رمادي فاتح
+            'white': 'FFFFFFFF',        # أبيض
+            'text': 'FF2D2D2D'          # نص داكن
+        }
+        
+        # الخطوط والتعبئات تُنشأ عند أول عملية تنسيق (انظر _init_styles)
+        self._styles_ready = False
+        
+        # دوال التنسيق الخاصة بكل ملف CSV
+        self._col_formatters = {
+            'transactions.csv': self.format_transaction_cell,
+            'users.csv': self.format_user_cell,
+            'complaints.csv': self.format_complaint_cell
         }
+    
+    def _init_styles(self):
+        """إنشاء كائنات التنسيق عند الحاجة الأولى فقط"""
+        if self._styles_ready:
+            return
+        
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
         
         # خطوط النظام
         self.fonts = {
@@ -35,13 +58,32 @@ class ExcelFormatter:
             'highlight': Font(name='Calibri', size=10, bold=True, color=self.colors['primary'])
         }
         
+        # تعبئات وخطوط الحالات (تُنشأ مرة واحدة بدلاً من كل خلية)
+        self.fill_primary = PatternFill(start_color=self.colors['primary'], end_color=self.colors['primary'], fill_type='solid')
+        self.fill_success = PatternFill(start_color=self.colors['success'], end_color=self.colors['success'], fill_type='solid')
+        self.fill_danger = PatternFill(start_color=self.colors['danger'], end_color=self.colors['danger'], fill_type='solid')
+        self.fill_warning = PatternFill(start_color=self.colors['warning'], end_color=self.colors['warning'], fill_type='solid')
+        self.fill_light = PatternFill(start_color=self.colors['light'], end_color=self.colors['light'], fill_type='solid')
+        self.font_white_bold = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+        self.font_text_bold = Font(name='Calibri', size=10, bold=True, color=self.colors['text'])
+        self.font_success_bold = Font(name='Calibri', size=10, bold=True, color=self.colors['success'])
+        self.font_danger_bold = Font(name='Calibri', size=10, bold=True, color=self.colors['danger'])
+        self.font_section_title = Font(name='Calibri', size=14, bold=True, color=self.colors['primary'])
+        self.align_center = Alignment(horizontal='center', vertical='center')
+        self.align_right = Alignment(horizontal='right', vertical='center', text_rotation=0)
+        
         # حدود الجدول
         thin_border = Side(border_style="thin", color=self.colors['primary'])
         self.border = Border(left=thin_border, right=thin_border, top=thin_border, bottom=thin_border)
+        
+        self._styles_ready = True
     
     def create_professional_workbook(self, filename='DUX_Professional_Report.xlsx'):
         """إنشاء مصنف Excel احترافي"""
-        wb = openpyxl.Workbook()
+        from openpyxl import Workbook
+        
+        self._init_styles()
+        wb = Workbook()
         
         # حذف الورقة الافتراضية
         wb.remove(wb.active)
@@ -71,109 +113,114 @@ class ExcelFormatter:
         if not os.path.exists(csv_file):
             return
         
+        self._init_styles()
+        
         ws = wb.create_sheet(title=sheet_name)
         
         try:
-            with open(csv_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                data = list(reader)
-            
-            if not data:
-                return
-            
-            # إضافة البيانات
-            for row_idx, row in enumerate(data, 1):
-                for col_idx, value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    
-                    # تنسيق الرأس
-                    if row_idx == 1:
-                        self.format_header_cell(cell)
-                    else:
-                        self.format_data_cell(cell, csv_file, col_idx)
-            
-            # تطبيق التنسيق الاحترافي
-            self.apply_professional_formatting(ws, len(data[0]) if data else 0, len(data))
-            
-            # إضافة جدول
-            if len(data) > 1:
-                self.add_table_style(ws, len(data[0]), len(data))
-            
-        except Exception as e:
+            with open(csv_file, 'r', encoding='utf-8-sig', newline='', buffering=CSV_BUFFER_SIZE) as f:
+                data = list(csv.reader(f))
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
             print(f"خطأ في تنسيق {csv_file}: {e}")
+            wb.remove(ws)
+            return
+        
+        if not data:
+            return
+        
+        # نمط الجدول (عند وجود بيانات) يرسم حدود جميع الخلايا، فلا حاجة لحدود يدوية
+        has_table = len(data) > 1
+        
+        # تنسيق الرأس
+        for col_idx, value in enumerate(data[0], 1):
+            self.format_header_cell(ws.cell(row=1, column=col_idx, value=value), bordered=not has_table)
+        
+        # إضافة البيانات (تحديد دالة التنسيق الخاصة مرة واحدة لكل ورقة)
+        col_formatter = self._col_formatters.get(csv_file)
+        body_font = self.fonts['body']
+        for row_idx, row in enumerate(data[1:], 2):
+            for col_idx, value in enumerate(row, 1):
+                cell = ws.cell(row=row_idx, column=col_idx, value=value)
+                cell.font = body_font
+                
+                if col_formatter is not None:
+                    col_formatter(cell, col_idx)
+        
+        # تطبيق التنسيق الاحترافي
+        self.apply_professional_formatting(ws, len(data[0]), len(data))
+        
+        # إضافة جدول
+        if has_table:
+            self.add_table_style(ws, len(data[0]), len(data))
     
-    def format_header_cell(self, cell):
+    def format_header_cell(self, cell, bordered=True):
         """تنسيق خلايا الرأس"""
         cell.font = self.fonts['header']
-        cell.fill = PatternFill(start_color=self.colors['primary'], end_color=self.colors['primary'], fill_type='solid')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = self.border
-    
-    def format_data_cell(self, cell, csv_file, col_idx):
-        """تنسيق خلايا البيانات"""
-        cell.font = self.fonts['body']
-        cell.border = self.border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # تنسيق خاص حسب نوع البيانات
-        if csv_file == 'transactions.csv':
-            self.format_transaction_cell(cell, col_idx)
-        elif csv_file == 'users.csv':
-            self.format_user_cell(cell, col_idx)
-        elif csv_file == 'complaints.csv':
-            self.format_complaint_cell(cell, col_idx)
+        cell.fill = self.fill_primary
+        cell.alignment = self.align_center
+        if bordered:
+            cell.border = self.border
     
     def format_transaction_cell(self, cell, col_idx):
         """تنسيق خاص للمعاملات"""
-        value = str(cell.value).lower() if cell.value else ''
+        value = cell.value.lower() if cell.value else ''
         
         # تلوين حالة المعاملة (عمود status)
         if col_idx == 10:  # عمود الحالة
             if value == 'approved':
-                cell.fill = PatternFill(start_color=self.colors['success'], end_color=self.colors['success'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+                cell.fill = self.fill_success
+                cell.font = self.font_white_bold
             elif value == 'rejected':
-                cell.fill = PatternFill(start_color=self.colors['danger'], end_color=self.colors['danger'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+                cell.fill = self.fill_danger
+                cell.font = self.font_white_bold
             elif value == 'pending':
-                cell.fill = PatternFill(start_color=self.colors['warning'], end_color=self.colors['warning'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['text'])
+                cell.fill = self.fill_warning
+                cell.font = self.font_text_bold
         
         # تنسيق نوع المعاملة (عمود type)
         elif col_idx == 5:
             if value == 'deposit':
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['success'])
+                cell.font = self.font_success_bold
             elif value == 'withdraw':
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['danger'])
+                cell.font = self.font_danger_bold
+        
+        # تخزين المبلغ كقيمة رقمية (عمود amount)
+        elif col_idx == 8:
+            try:
+                cell.value = float(cell.value)
+            except ValueError:
+                pass
     
     def format_user_cell(self, cell, col_idx):
         """تنسيق خاص للمستخدمين"""
-        value = str(cell.value).lower() if cell.value else ''
+        value = cell.value.lower() if cell.value else ''
         
         # تلوين حالة الحظر (عمود is_banned)
         if col_idx == 7:
             if value == 'yes':
-                cell.fill = PatternFill(start_color=self.colors['danger'], end_color=self.colors['danger'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+                cell.fill = self.fill_danger
+                cell.font = self.font_white_bold
             else:
-                cell.fill = PatternFill(start_color=self.colors['success'], end_color=self.colors['success'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+                cell.fill = self.fill_success
+                cell.font = self.font_white_bold
     
     def format_complaint_cell(self, cell, col_idx):
         """تنسيق خاص للشكاوى"""
-        value = str(cell.value).lower() if cell.value else ''
+        value = cell.value.lower() if cell.value else ''
         
         # تلوين حالة الشكوى (عمود status)
         if col_idx == 5:
             if value == 'resolved':
-                cell.fill = PatternFill(start_color=self.colors['success'], end_color=self.colors['success'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['white'])
+                cell.fill = self.fill_success
+                cell.font = self.font_white_bold
             elif value == 'pending':
-                cell.fill = PatternFill(start_color=self.colors['warning'], end_color=self.colors['warning'], fill_type='solid')
-                cell.font = Font(name='Calibri', size=10, bold=True, color=self.colors['text'])
+                cell.fill = self.fill_warning
+                cell.font = self.font_text_bold
     
     def apply_professional_formatting(self, ws, cols, rows):
         """تطبيق التنسيق الاحترافي"""
+        from openpyxl.utils import get_column_letter
+        
         # تحديد عرض الأعمدة
         for col in range(1, cols + 1):
             column_letter = get_column_letter(col)
@@ -187,18 +234,22 @@ class ExcelFormatter:
             for cell in row:
                 if cell.value and isinstance(cell.value, str):
                     # التحقق من وجود نص عربي
-                    if any('\u0600' <= char <= '\u06FF' for char in cell.value):
-                        cell.alignment = Alignment(horizontal='right', vertical='center', text_rotation=0)
+                    if _AR_RE.search(cell.value):
+                        cell.alignment = self.align_right
                     else:
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
+                        cell.alignment = self.align_center
     
     def add_table_style(self, ws, cols, rows):
         """إضافة نمط جدول احترافي"""
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.table import Table, TableStyleInfo
+        
         # تحديد نطاق الجدول
         table_range = f"A1:{get_column_letter(cols)}{rows}"
         
         # إنشاء الجدول
-        table = Table(displayName=f"Table_{ws.title}", ref=table_range)
+        # أسماء الجداول لا تقبل المسافات
+        table = Table(displayName=f"Table_{ws.title.replace(' ', '_')}", ref=table_range)
         
         # تطبيق نمط جدول احترافي
         style = TableStyleInfo(
@@ -215,6 +266,9 @@ class ExcelFormatter:
     
     def create_summary_sheet(self, wb, sheet_name):
         """إنشاء ورقة الإحصائيات"""
+        from openpyxl.styles import Font, Alignment
+        
+        self._init_styles()
         ws = wb.create_sheet(title=sheet_name)
         
         # بيانات الإحصائيات
@@ -235,10 +289,11 @@ class ExcelFormatter:
         # إضافة الإحصائيات
         row = 4
         for category, data in stats.items():
-            # عنوان القسم
-            ws[f'A{row}'] = category
-            ws[f'A{row}'].font = Font(name='Calibri', size=14, bold=True, color=self.colors['primary'])
-            ws[f'A{row}'].fill = PatternFill(start_color=self.colors['light'], end_color=self.colors['light'], fill_type='solid')
+            # عنوان القسم (التنسيق على الخلية العلوية اليسرى فقط، فهي وحدها تحمل نمط الدمج)
+            title_cell = ws[f'A{row}']
+            title_cell.value = category
+            title_cell.font = self.font_section_title
+            title_cell.fill = self.fill_light
             ws.merge_cells(f'A{row}:E{row}')
             row += 1
             
@@ -268,77 +323,78 @@ class ExcelFormatter:
             'إحصائيات الشركات': {}
         }
         
-        try:
-            # إحصائيات المستخدمين
-            if os.path.exists('users.csv'):
-                with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                    users = list(csv.DictReader(f))
-                    stats['إحصائيات المستخدمين'] = {
-                        'إجمالي المستخدمين': len(users),
-                        'المستخدمين النشطين': len([u for u in users if u.get('is_banned', 'no').lower() != 'yes']),
-                        'المستخدمين المحظورين': len([u for u in users if u.get('is_banned', 'no').lower() == 'yes']),
-                        'مستخدمي العربية': len([u for u in users if u.get('language', 'ar') == 'ar']),
-                        'مستخدمي الإنجليزية': len([u for u in users if u.get('language', 'ar') == 'en'])
-                    }
+        # إحصائيات المستخدمين
+        users = self._read_csv_rows('users.csv')
+        if users is not None:
+            stats['إحصائيات المستخدمين'] = {
+                'إجمالي المستخدمين': len(users),
+                'المستخدمين النشطين': len([u for u in users if u.get('is_banned', 'no').lower() != 'yes']),
+                'المستخدمين المحظورين': len([u for u in users if u.get('is_banned', 'no').lower() == 'yes']),
+                'مستخدمي العربية': len([u for u in users if u.get('language', 'ar') == 'ar']),
+                'مستخدمي الإنجليزية': len([u for u in users if u.get('language', 'ar') == 'en'])
+            }
+        
+        # إحصائيات المعاملات
+        transactions = self._read_csv_rows('transactions.csv')
+        if transactions is not None:
+            approved = [t for t in transactions if t.get('status') == 'approved']
+            rejected = [t for t in transactions if t.get('status') == 'rejected']
+            pending = [t for t in transactions if t.get('status') == 'pending']
+            deposits = [t for t in transactions if t.get('type') == 'deposit']
+            withdrawals = [t for t in transactions if t.get('type') == 'withdraw']
             
-            # إحصائيات المعاملات
-            if os.path.exists('transactions.csv'):
-                with open('transactions.csv', 'r', encoding='utf-8-sig') as f:
-                    transactions = list(csv.DictReader(f))
-                    
-                    approved = [t for t in transactions if t.get('status') == 'approved']
-                    rejected = [t for t in transactions if t.get('status') == 'rejected']
-                    pending = [t for t in transactions if t.get('status') == 'pending']
-                    deposits = [t for t in transactions if t.get('type') == 'deposit']
-                    withdrawals = [t for t in transactions if t.get('type') == 'withdraw']
-                    
-                    stats['إحصائيات المعاملات'] = {
-                        'إجمالي المعاملات': len(transactions),
-                        'المعاملات المُوافقة': len(approved),
-                        'المعاملات المرفوضة': len(rejected),
-                        'المعاملات المعلقة': len(pending),
-                        'طلبات الإيداع': len(deposits),
-                        'طلبات السحب': len(withdrawals),
-                        'معدل الموافقة': f"{(len(approved)/len(transactions)*100):.1f}%" if transactions else "0%"
-                    }
+            stats['إحصائيات المعاملات'] = {
+                'إجمالي المعاملات': len(transactions),
+                'المعاملات المُوافقة': len(approved),
+                'المعاملات المرفوضة': len(rejected),
+                'المعاملات المعلقة': len(pending),
+                'طلبات الإيداع': len(deposits),
+                'طلبات السحب': len(withdrawals),
+                'معدل الموافقة': f"{(len(approved)/len(transactions)*100):.1f}%" if transactions else "0%"
+            }
+        
+        # إحصائيات الشكاوى
+        complaints = self._read_csv_rows('complaints.csv')
+        if complaints is not None:
+            resolved = [c for c in complaints if c.get('status') == 'resolved']
+            pending = [c for c in complaints if c.get('status') == 'pending']
             
-            # إحصائيات الشكاوى
-            if os.path.exists('complaints.csv'):
-                with open('complaints.csv', 'r', encoding='utf-8-sig') as f:
-                    complaints = list(csv.DictReader(f))
-                    
-                    resolved = [c for c in complaints if c.get('status') == 'resolved']
-                    pending = [c for c in complaints if c.get('status') == 'pending']
-                    
-                    stats['إحصائيات الشكاوى'] = {
-                        'إجمالي الشكاوى': len(complaints),
-                        'الشكاوى المحلولة': len(resolved),
-                        'الشكاوى المعلقة': len(pending),
-                        'معدل الحل': f"{(len(resolved)/len(complaints)*100):.1f}%" if complaints else "0%"
-                    }
+            stats['إحصائيات الشكاوى'] = {
+                'إجمالي الشكاوى': len(complaints),
+                'الشكاوى المحلولة': len(resolved),
+                'الشكاوى المعلقة': len(pending),
+                'معدل الحل': f"{(len(resolved)/len(complaints)*100):.1f}%" if complaints else "0%"
+            }
+        
+        # إحصائيات الشركات
+        companies = self._read_csv_rows('companies.csv')
+        if companies is not None:
+            active = [c for c in companies if c.get('is_active', '').lower() == 'active']
+            both_type = [c for c in companies if c.get('type') == 'both']
+            deposit_only = [c for c in companies if c.get('type') == 'deposit']
+            withdraw_only = [c for c in companies if c.get('type') == 'withdraw']
             
-            # إحصائيات الشركات
-            if os.path.exists('companies.csv'):
-                with open('companies.csv', 'r', encoding='utf-8-sig') as f:
-                    companies = list(csv.DictReader(f))
-                    
-                    active = [c for c in companies if c.get('is_active', '').lower() == 'active']
-                    both_type = [c for c in companies if c.get('type') == 'both']
-                    deposit_only = [c for c in companies if c.get('type') == 'deposit']
-                    withdraw_only = [c for c in companies if c.get('type') == 'withdraw']
-                    
-                    stats['إحصائيات الشركات'] = {
-                        'إجمالي الشركات': len(companies),
-                        'الشركات النشطة': len(active),
-                        'شركات الإيداع والسحب': len(both_type),
-                        'شركات الإيداع فقط': len(deposit_only),
-                        'شركات السحب فقط': len(withdraw_only)
-                    }
-        
-        except Exception as e:
-            print(f"خطأ في حساب الإحصائيات: {e}")
+            stats['إحصائيات الشركات'] = {
+                'إجمالي الشركات': len(companies),
+                'الشركات النشطة': len(active),
+                'شركات الإيداع والسحب': len(both_type),
+                'شركات الإيداع فقط': len(deposit_only),
+                'شركات السحب فقط': len(withdraw_only)
+            }
         
         return stats
+    
+    def _read_csv_rows(self, csv_file):
+        """قراءة ملف CSV كقائمة قواميس، أو None إذا تعذرت القراءة"""
+        if not os.path.exists(csv_file):
+            return None
+        
+        try:
+            with open(csv_file, 'r', encoding='utf-8-sig', newline='', buffering=CSV_BUFFER_SIZE) as f:
+                return list(csv.DictReader(f))
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"خطأ في حساب الإحصائيات ({csv_file}): {e}")
+            return None
 
 # مثال للاستخدام
 if __name__ == "__main__":
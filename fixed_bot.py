@@ -1,18 +1,31 @@
 #!/usr/bin/env python3
 """
 LangSense Bot - مُحسن ومُبسط
-يحفظ البيانات في ملفات Excel بدون قواعد بيانات
+يحفظ البيانات في ملفات Excel مع فهرس SQLite للبحث السريع
 """
 
 import os
 import json
 import time
+import asyncio
 import logging
 import csv
+import sqlite3
+import secrets
+import atexit
 from datetime import datetime
-import urllib.request
+import http.client
 import urllib.parse
-import urllib.error
+
+# orjson أسرع بكثير في المسار الساخن لـ Telegram API؛ json القياسي كبديل
+try:
+    import orjson
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(data):
+        return json.dumps(data).encode('utf-8')
+    json_loads = json.loads
 
 # إعداد التسجيل
 logging.basicConfig(
@@ -21,66 +34,237 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# أعمدة ملفات البيانات (وجداول قاعدة البيانات المقابلة)
+USERS_FIELDS = ['telegram_id', 'name', 'phone', 'customer_id', 'language', 'date', 'is_banned', 'ban_reason']
+TRANSACTIONS_FIELDS = ['id', 'customer_id', 'telegram_id', 'name', 'type', 'amount', 'status', 'date', 'admin_note', 'payment_method', 'receipt_info']
+COMPLAINTS_FIELDS = ['id', 'customer_id', 'subject', 'message', 'status', 'date']
+
+# نصوص أزرار القائمة بالعربية والإنجليزية
+DEPOSIT_TRIGGERS = frozenset({'💰 إيداع', '💰 Deposit'})
+WITHDRAW_TRIGGERS = frozenset({'💸 سحب', '💸 Withdraw'})
+MY_REQUESTS_TRIGGERS = frozenset({'📋 طلباتي', '📋 My Requests'})
+PROFILE_TRIGGERS = frozenset({'👤 حسابي', '👤 Profile'})
+COMPLAINT_TRIGGERS = frozenset({'📨 شكوى', '📨 Complaint'})
+
+# أزرار تغيير اللغة (نص الزر -> اللغة الجديدة)
+LANGUAGE_TRIGGERS = {'🇺🇸 English': 'en', '🇸🇦 العربية': 'ar'}
+
+# قاعدة بيانات البحث المفهرس (ملفات CSV تبقى سجلاً للإضافة تقرأه تقارير Excel)
+DB_FILE = 'bot.db'
+
+# ملف تفضيلات اللغة القديم (يُستورد مرة واحدة عند إنشاء قاعدة البيانات)
+PREFS_FILE = 'user_prefs.json'
+
+# خادم Telegram API
+TELEGRAM_HOST = 'api.telegram.org'
+
+# مهلة الاستطلاع الطويل (ثوانٍ) - تيليجرام يُبقي الطلب مفتوحاً حتى وصول تحديث
+POLL_TIMEOUT = 30
+
+# أقصى عدد تحديثات في الدفعة الواحدة، والبوت يعالج الرسائل فقط
+POLL_LIMIT = 100
+ALLOWED_UPDATES = ['message']
+
+# الحد الأقصى للرسائل الجماعية في الثانية (حد تيليجرام العام 30 رسالة/ثانية)
+BROADCAST_RATE = 25
+
+# حجم مخزن قراءة ملفات CSV (1 ميجابايت)
+CSV_BUFFER_SIZE = 1 << 20
+
+def open_csv(path):
+    """فتح ملف CSV للقراءة بترميز UTF-8 ومخزن كبير، مع تخطي BOM أول الملف فقط"""
+    f = open(path, 'r', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE)
+    if f.read(1) != '\ufeff':
+        f.seek(0)
+    return f
+
+def create_csv(path, rows):
+    """إنشاء ملف CSV جديد بصفوفه الأولى؛ O_EXCL يمنع نسختين من البوت من الكتابة فوق الملف نفسه"""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return
+    with open(fd, 'w', newline='', encoding='utf-8-sig') as f:
+        csv.writer(f).writerows(rows)
+
+def csv_escape(value):
+    """اقتباس قيمة CSV عند الحاجة فقط (نفس قواعد csv.writer الافتراضية)"""
+    value = str(value)
+    if any(ch in value for ch in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
 class LangSenseBot:
     def __init__(self, token):
         self.token = token
-        self.api_url = f"https://api.telegram.org/bot{token}"
+        self.api_url = f"https://{TELEGRAM_HOST}/bot{token}"
+        self.api_path = f"/bot{token}"
+        # اتصال HTTPS دائم يُعاد استخدامه لكل الطلبات (بدون مصافحة TLS لكل رسالة)
+        self._conn = None
         self.offset = 0
+        self._allowed_updates = urllib.parse.quote(json.dumps(ALLOWED_UPDATES, separators=(',', ':')))
+        # عدادات الإحصائيات (تُحدَّث مع كل حفظ بدلاً من إعادة قراءة الملفات)
+        self.users_count = 0
+        self.trans_count = 0
+        self.pending_count = 0
+        self.comp_count = 0
+        # وسائل الدفع محفوظة في الذاكرة (الملف نادراً ما يتغير)
+        self.payment_methods = []
+        # جدول توجيه أزرار القائمة (نص الزر -> المعالج)
+        self.text_handlers = {}
+        for triggers, handler in ((DEPOSIT_TRIGGERS, self.handle_deposit),
+                                  (WITHDRAW_TRIGGERS, self.handle_withdraw),
+                                  (MY_REQUESTS_TRIGGERS, self.handle_my_requests),
+                                  (PROFILE_TRIGGERS, self.handle_profile),
+                                  (COMPLAINT_TRIGGERS, self.handle_complaint)):
+            self.text_handlers.update(dict.fromkeys(triggers, handler))
+        # لوحات المفاتيح ثابتة، لذا تُحوَّل إلى JSON مرة واحدة فقط
+        self._kb_main = {lang: json_dumps(self.build_main_keyboard(lang)) for lang in ('ar', 'en')}
+        self._kb_phone = {lang: json_dumps(self.build_phone_keyboard(lang)) for lang in ('ar', 'en')}
         self.init_files()
+        self.init_db()
         
     def init_files(self):
         """إنشاء ملفات Excel"""
-        # ملف المستخدمين
-        if not os.path.exists('users.csv'):
-            with open('users.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(['telegram_id', 'name', 'phone', 'customer_id', 'language', 'date', 'is_banned', 'ban_reason'])
-        
-        # ملف المعاملات
-        if not os.path.exists('transactions.csv'):
-            with open('transactions.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(['id', 'customer_id', 'telegram_id', 'name', 'type', 'amount', 'status', 'date', 'admin_note', 'payment_method', 'receipt_info'])
-        
-        # ملف الشكاوى
-        if not os.path.exists('complaints.csv'):
-            with open('complaints.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(['id', 'customer_id', 'subject', 'message', 'status', 'date'])
-        
-        # ملف وسائل الدفع
-        if not os.path.exists('payment_methods.csv'):
-            with open('payment_methods.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(['id', 'name', 'type', 'details', 'is_active', 'created_date'])
-                # إضافة وسائل افتراضية
-                writer.writerow(['1', 'البنك الأهلي', 'deposit', 'رقم الحساب: 1234567890', 'active', datetime.now().strftime('%Y-%m-%d')])
-                writer.writerow(['2', 'بنك الراجحي', 'deposit', 'رقم الحساب: 0987654321', 'active', datetime.now().strftime('%Y-%m-%d')])
-                writer.writerow(['3', 'STC Pay', 'withdraw', 'رقم الجوال: 0501234567', 'active', datetime.now().strftime('%Y-%m-%d')])
+        # قراءة واحدة للمجلد بدلاً من فحص كل ملف على حدة
+        present = {entry.name for entry in os.scandir('.')}
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        # ملفات المستخدمين والمعاملات والشكاوى
+        for name, fields in (('users.csv', USERS_FIELDS),
+                             ('transactions.csv', TRANSACTIONS_FIELDS),
+                             ('complaints.csv', COMPLAINTS_FIELDS)):
+            if name not in present:
+                create_csv(name, [fields])
+        
+        # ملف وسائل الدفع (مع وسائل افتراضية)
+        if 'payment_methods.csv' not in present:
+            create_csv('payment_methods.csv', [
+                ['id', 'name', 'type', 'details', 'is_active', 'created_date'],
+                ['1', 'البنك الأهلي', 'deposit', 'رقم الحساب: 1234567890', 'active', today],
+                ['2', 'بنك الراجحي', 'deposit', 'رقم الحساب: 0987654321', 'active', today],
+                ['3', 'STC Pay', 'withdraw', 'رقم الجوال: 0501234567', 'active', today],
+            ])
         
-        logger.info("تم إنشاء ملفات Excel بنجاح")
+        # تمريرة واحدة بـ csv.reader (بدون بناء dict لكل صف)
+        with open_csv('transactions.csv') as f:
+            reader = csv.reader(f)
+            header = next(reader, TRANSACTIONS_FIELDS)
+            status_idx = header.index('status')
+            for row in reader:
+                self.trans_count += 1
+                self.pending_count += len(row) > status_idx and row[status_idx] == 'pending'
+        
+        with open_csv('complaints.csv') as f:
+            self.comp_count = sum(1 for _ in csv.reader(f)) - 1
         
+        self.reload_payment_methods()
+        
+        # مقابض إضافة دائمة بدلاً من فتح الملف وإغلاقه مع كل صف
+        self.append_files = {
+            name: open(name, 'a', newline='', encoding='utf-8')
+            for name in ('users.csv', 'transactions.csv', 'complaints.csv')
+        }
+        atexit.register(self.close_files)
+        
+        logger.info("تم إنشاء ملفات Excel بنجاح")
+    
+    def close_files(self):
+        """إغلاق مقابض ملفات CSV"""
+        for f in self.append_files.values():
+            f.close()
+    
+    def append_row(self, csv_file, row):
+        """إضافة صف إلى ملف CSV بكتابة واحدة"""
+        f = self.append_files[csv_file]
+        f.write(','.join(csv_escape(value) for value in row) + '\r\n')
+        f.flush()
+    
+    def init_db(self):
+        """فتح قاعدة SQLite المفهرسة واستيراد ملفات CSV عند أول تشغيل"""
+        # المعالجات قد تعمل على خيط Webhook؛ الوصول متسلسل دائماً
+        self.db = sqlite3.connect(DB_FILE, isolation_level=None, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        
+        for table, fields in (('users', USERS_FIELDS), ('transactions', TRANSACTIONS_FIELDS), ('complaints', COMPLAINTS_FIELDS)):
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{field} TEXT' for field in fields)})")
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_users_tid ON users(telegram_id)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_tx_customer ON transactions(customer_id, date)')
+        
+        if self.db.execute('PRAGMA user_version').fetchone()[0] == 0:
+            self.import_csv_data()
+        
+        self.users_count = self.db.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    
+    def import_csv_data(self):
+        """نسخ البيانات الموجودة في ملفات CSV إلى قاعدة البيانات (مرة واحدة)"""
+        prefs = {}
+        if os.path.exists(PREFS_FILE):
+            with open(PREFS_FILE, 'r', encoding='utf-8') as f:
+                prefs = json.load(f)
+        
+        self.db.execute('BEGIN')
+        for table, csv_file, fields in (('users', 'users.csv', USERS_FIELDS),
+                                        ('transactions', 'transactions.csv', TRANSACTIONS_FIELDS),
+                                        ('complaints', 'complaints.csv', COMPLAINTS_FIELDS)):
+            with open_csv(csv_file) as f:
+                rows = csv.DictReader(f)
+                if table == 'users':
+                    rows = ({**row, 'language': prefs.get(row['telegram_id'], row['language'])} for row in rows)
+                self.db.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' * len(fields))})",
+                    ([row.get(field) or '' for field in fields] for row in rows)
+                )
+        self.db.execute('PRAGMA user_version = 1')
+        self.db.execute('COMMIT')
+        logger.info("تم استيراد بيانات CSV إلى قاعدة البيانات")
+        
+    def http_request(self, method, path, body=None, timeout=10):
+        """إرسال طلب عبر الاتصال الدائم، مع إعادة الاتصال مرة واحدة إذا أغلقه الخادم"""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPSConnection(TELEGRAM_HOST, timeout=timeout)
+            else:
+                self._conn.timeout = timeout
+                if self._conn.sock:
+                    self._conn.sock.settimeout(timeout)
+            
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # اتصال keep-alive منتهي من جهة الخادم
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+            except Exception:
+                self._conn.close()
+                self._conn = None
+                raise
+    
     def api_call(self, method, data=None):
         """استدعاء Telegram API مُبسط"""
-        url = f"{self.api_url}/{method}"
+        path = f"{self.api_path}/{method}"
         
         try:
             if data:
-                # تحويل البيانات إلى JSON
-                json_data = json.dumps(data).encode('utf-8')
-                req = urllib.request.Request(url, data=json_data)
-                req.add_header('Content-Type', 'application/json')
+                # تحويل البيانات إلى JSON (ما لم تكن مُحوَّلة مسبقاً)
+                json_data = data if isinstance(data, bytes) else json_dumps(data)
+                status, body = self.http_request('POST', path, json_data)
             else:
-                req = urllib.request.Request(url)
+                status, body = self.http_request('GET', path)
+            
+            if status != 200:
+                logger.error(f"HTTP Error {status}: {body.decode('utf-8')}")
+                return None
             
-            with urllib.request.urlopen(req, timeout=10) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                return result
+            return json_loads(body)
                 
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode('utf-8')
-            logger.error(f"HTTP Error {e.code}: {error_body}")
-            return None
         except Exception as e:
             logger.error(f"خطأ في API: {e}")
             return None
@@ -93,24 +277,36 @@ class LangSenseBot:
             'parse_mode': 'HTML'
         }
         
-        if keyboard:
+        if isinstance(keyboard, bytes):
+            # لوحة مُحوَّلة مسبقاً: تُلصق مباشرة في نهاية كائن JSON بدون إعادة تحويل
+            data = json_dumps(data)[:-1] + b',"reply_markup":' + keyboard + b'}'
+        elif keyboard:
             data['reply_markup'] = keyboard
             
         return self.api_call('sendMessage', data)
     
     def get_updates(self):
         """جلب التحديثات"""
-        url = f"{self.api_url}/getUpdates?offset={self.offset + 1}&timeout=10"
+        path = (f"{self.api_path}/getUpdates?offset={self.offset + 1}&timeout={POLL_TIMEOUT}"
+                f"&limit={POLL_LIMIT}&allowed_updates={self._allowed_updates}")
         
         try:
-            with urllib.request.urlopen(url, timeout=15) as response:
-                return json.loads(response.read().decode('utf-8'))
+            status, body = self.http_request('GET', path, timeout=POLL_TIMEOUT + 5)
+            return json_loads(body)
         except Exception as e:
             logger.error(f"خطأ في جلب التحديثات: {e}")
             return None
     
     def main_keyboard(self, lang='ar'):
-        """لوحة المفاتيح الرئيسية"""
+        """لوحة المفاتيح الرئيسية (JSON جاهز)"""
+        return self._kb_main['ar' if lang == 'ar' else 'en']
+    
+    def phone_keyboard(self, lang='ar'):
+        """لوحة طلب رقم الهاتف (JSON جاهز)"""
+        return self._kb_phone['ar' if lang == 'ar' else 'en']
+    
+    def build_main_keyboard(self, lang='ar'):
+        """بناء لوحة المفاتيح الرئيسية"""
         if lang == 'ar':
             return {
                 'keyboard': [
@@ -130,8 +326,8 @@ class LangSenseBot:
                 'resize_keyboard': True
             }
     
-    def phone_keyboard(self, lang='ar'):
-        """لوحة طلب رقم الهاتف"""
+    def build_phone_keyboard(self, lang='ar'):
+        """بناء لوحة طلب رقم الهاتف"""
         text = '📱 مشاركة رقم الهاتف' if lang == 'ar' else '📱 Share Phone'
         return {
             'keyboard': [[{'text': text, 'request_contact': True}]],
@@ -141,55 +337,51 @@ class LangSenseBot:
     
     def find_user(self, telegram_id):
         """البحث عن مستخدم"""
-        try:
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['telegram_id'] == str(telegram_id):
-                        return row
-        except:
-            pass
-        return None
+        row = self.db.execute('SELECT * FROM users WHERE telegram_id = ?', (str(telegram_id),)).fetchone()
+        return dict(row) if row else None
     
     def save_user(self, telegram_id, name, phone, customer_id, language='ar'):
         """حفظ مستخدم جديد"""
-        with open('users.csv', 'a', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                telegram_id, name, phone, customer_id, 
-                language, datetime.now().strftime('%Y-%m-%d %H:%M'), 'no', ''
-            ])
+        row = [
+            str(telegram_id), name, phone, customer_id, 
+            language, datetime.now().strftime('%Y-%m-%d %H:%M'), 'no', ''
+        ]
+        self.append_row('users.csv', row)
+        
+        self.db.execute(f"INSERT INTO users VALUES ({', '.join('?' * len(row))})", row)
+        self.users_count += 1
     
     def generate_customer_id(self):
         """توليد رقم عميل"""
-        try:
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                lines = f.readlines()
-                count = len(lines) - 1  # طرح سطر العناوين
-                return f"C{count + 1:06d}"
-        except:
-            return "C000001"
+        return f"C{self.users_count + 1:06d}"
     
     def save_transaction(self, customer_id, telegram_id, name, trans_type, amount, payment_method='', receipt_info='', status='pending'):
         """حفظ معاملة"""
         trans_id = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        with open('transactions.csv', 'a', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                trans_id, customer_id, telegram_id, name, trans_type, amount, 
-                status, datetime.now().strftime('%Y-%m-%d %H:%M'), '', payment_method, receipt_info
-            ])
+        row = [
+            trans_id, customer_id, str(telegram_id), name, trans_type, amount, 
+            status, datetime.now().strftime('%Y-%m-%d %H:%M'), '', payment_method, receipt_info
+        ]
+        self.append_row('transactions.csv', row)
+        
+        self.db.execute(f"INSERT INTO transactions VALUES ({', '.join('?' * len(row))})", row)
+        self.trans_count += 1
+        if status == 'pending':
+            self.pending_count += 1
         return trans_id
     
     def save_complaint(self, customer_id, subject, message, status='new'):
         """حفظ شكوى"""
         comp_id = f"COMP{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        with open('complaints.csv', 'a', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                comp_id, customer_id, subject, message, 
-                status, datetime.now().strftime('%Y-%m-%d %H:%M')
-            ])
+        row = [
+            comp_id, customer_id, subject, message, 
+            status, datetime.now().strftime('%Y-%m-%d %H:%M')
+        ]
+        self.append_row('complaints.csv', row)
+        
+        self.db.execute(f"INSERT INTO complaints VALUES ({', '.join('?' * len(row))})", row)
+        
+        self.comp_count += 1
         return comp_id
     
     def handle_start(self, message):
@@ -232,19 +424,21 @@ class LangSenseBot:
         user = self.find_user(telegram_id)
         return user and user.get('is_banned', 'no') == 'yes'
     
+    def reload_payment_methods(self):
+        """إعادة تحميل وسائل الدفع (تُستدعى بعد أي تعديل إداري على الملف)"""
+        try:
+            with open_csv('payment_methods.csv') as f:
+                self.payment_methods = list(csv.DictReader(f))
+        except Exception as e:
+            logger.error(f"خطأ في تحميل وسائل الدفع: {e}")
+            self.payment_methods = []
+    
     def get_payment_methods(self, method_type=None):
         """جلب وسائل الدفع"""
-        methods = []
-        try:
-            with open('payment_methods.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if method_type is None or row['type'] == method_type:
-                        if row['is_active'] == 'active':
-                            methods.append(row)
-        except:
-            pass
-        return methods
+        return [
+            m for m in self.payment_methods
+            if m.get('is_active') == 'active' and (method_type is None or m.get('type') == method_type)
+        ]
     
     def handle_admin_commands(self, message):
         """أوامر الأدمن"""
@@ -252,35 +446,12 @@ class LangSenseBot:
             self.send_message(message['chat']['id'], "🚫 غير مسموح! هذا الأمر للأدمن فقط")
             return
         
-        # إحصائيات
-        try:
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                users_count = len(f.readlines()) - 1
-        except:
-            users_count = 0
-            
-        try:
-            with open('transactions.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                trans_list = list(reader)
-                trans_count = len(trans_list)
-                pending_count = len([t for t in trans_list if t['status'] == 'pending'])
-        except:
-            trans_count = 0
-            pending_count = 0
-        
-        try:
-            with open('complaints.csv', 'r', encoding='utf-8-sig') as f:
-                comp_count = len(f.readlines()) - 1
-        except:
-            comp_count = 0
-        
         admin_text = f"""🛠️ لوحة الإدارة المتقدمة
 
 📊 الإحصائيات:
-👥 المستخدمين: {users_count}
-💰 المعاملات: {trans_count} (⏳ معلقة: {pending_count})
-📨 الشكاوى: {comp_count}
+👥 المستخدمين: {self.users_count}
+💰 المعاملات: {self.trans_count} (⏳ معلقة: {self.pending_count})
+📨 الشكاوى: {self.comp_count}
 
 🔧 أوامر إدارة المستخدمين:
 /search اسم_أو_رقم - البحث عن مستخدم
@@ -317,50 +488,56 @@ class LangSenseBot:
         
         broadcast_msg = parts[1]
         
-        # جلب جميع المستخدمين
-        users = []
-        try:
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                users = list(reader)
-        except:
-            pass
+        # معرفات جميع المستخدمين فقط (بدون جلب الصفوف كاملة)
+        chat_ids = [row[0] for row in self.db.execute('SELECT telegram_id FROM users')]
         
-        if not users:
+        if not chat_ids:
             self.send_message(message['chat']['id'], "لا يوجد مستخدمين لإرسال الرسالة إليهم")
             return
         
-        # إرسال الرسالة لجميع المستخدمين
-        success_count = 0
-        for user in users:
-            try:
-                result = self.send_message(user['telegram_id'], f"📢 رسالة من الإدارة:\n\n{broadcast_msg}")
-                if result and result.get('ok'):
-                    success_count += 1
-                time.sleep(0.1)  # تجنب السبام
-            except:
-                pass
+        # إرسال الرسالة لجميع المستخدمين بالتوازي
+        success_count = asyncio.run(self._broadcast_async(chat_ids, f"📢 رسالة من الإدارة:\n\n{broadcast_msg}"))
         
-        self.send_message(message['chat']['id'], f"✅ تم إرسال الرسالة إلى {success_count} من {len(users)} مستخدم")
+        self.send_message(message['chat']['id'], f"✅ تم إرسال الرسالة إلى {success_count} من {len(chat_ids)} مستخدم")
+    
+    async def _broadcast_async(self, chat_ids, text):
+        """إرسال رسالة لعدة مستخدمين عبر اتصال واحد مع تحديد المعدل"""
+        import aiohttp
+        
+        url = f"{self.api_url}/sendMessage"
+        sem = asyncio.Semaphore(BROADCAST_RATE)
+        
+        async def send(session, chat_id):
+            async with sem:
+                try:
+                    async with session.post(url, json={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}) as response:
+                        result = await response.json()
+                        ok = bool(result.get('ok'))
+                except Exception as e:
+                    logger.error(f"خطأ في الإرسال الجماعي إلى {chat_id}: {e}")
+                    ok = False
+                # حجز المقعد ثانية كاملة يحد الإرسال إلى BROADCAST_RATE رسالة في الثانية
+                await asyncio.sleep(1)
+                return ok
+        
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            results = await asyncio.gather(*(send(session, chat_id) for chat_id in chat_ids))
+        return sum(results)
     
     def handle_users_list(self, message):
         """عرض قائمة المستخدمين"""
         if not self.is_admin(message['from']['id']):
             return
         
-        try:
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                users = list(reader)
-        except:
-            users = []
+        # آخر 10 مستخدمين مباشرة من نهاية الجدول
+        last_users = self.db.execute('SELECT * FROM users ORDER BY rowid DESC LIMIT 10').fetchall()
         
-        if not users:
+        if not last_users:
             self.send_message(message['chat']['id'], "لا يوجد مستخدمين مسجلين")
             return
         
         users_text = "👥 قائمة المستخدمين:\n\n"
-        for user in users[-10:]:  # آخر 10 مستخدمين
+        for user in reversed(last_users):
             users_text += f"• {user['name']} ({user['customer_id']})\n  📱 {user['phone']}\n  📅 {user['date']}\n\n"
         
         self.send_message(message['chat']['id'], users_text)
@@ -394,84 +571,109 @@ class LangSenseBot:
         lang = user.get('language', 'ar')
         
         # تغيير اللغة
-        if text == '🇺🇸 English':
-            # تحديث اللغة في الملف
-            self.update_user_language(user['telegram_id'], 'en')
-            self.send_message(chat_id, "✅ Language changed to English", self.main_keyboard('en'))
-            return
-        elif text == '🇸🇦 العربية':
-            self.update_user_language(user['telegram_id'], 'ar')
-            self.send_message(chat_id, "✅ تم تغيير اللغة إلى العربية", self.main_keyboard('ar'))
+        new_lang = LANGUAGE_TRIGGERS.get(text)
+        if new_lang:
+            self.update_user_language(user['telegram_id'], new_lang)
+            response = "✅ تم تغيير اللغة إلى العربية" if new_lang == 'ar' else "✅ Language changed to English"
+            self.send_message(chat_id, response, self.main_keyboard(new_lang))
             return
         
-        # معالجة الطلبات
-        if text in ['💰 إيداع', '💰 Deposit']:
-            trans_id = self.save_transaction(user['customer_id'], 'deposit', '0')
-            response = f"💰 طلب إيداع جديد\n🆔 رقم المعاملة: {trans_id}\n\nيرجى إرسال المبلغ وصورة الإيصال" if lang == 'ar' else f"💰 New deposit request\n🆔 Transaction: {trans_id}\n\nPlease send amount and receipt image"
-            self.send_message(chat_id, response)
-            
-        elif text in ['💸 سحب', '💸 Withdraw']:
-            trans_id = self.save_transaction(user['customer_id'], 'withdraw', '0')
-            response = f"💸 طلب سحب جديد\n🆔 رقم المعاملة: {trans_id}\n\nيرجى إرسال المبلغ وبيانات الحساب" if lang == 'ar' else f"💸 New withdrawal request\n🆔 Transaction: {trans_id}\n\nPlease send amount and account details"
-            self.send_message(chat_id, response)
-            
-        elif text in ['📋 طلباتي', '📋 My Requests']:
-            # عرض آخر 5 طلبات
-            transactions = self.get_user_transactions(user['customer_id'])
-            if transactions:
-                response = "📋 آخر طلباتك:\n\n" if lang == 'ar' else "📋 Your recent requests:\n\n"
-                for trans in transactions[-5:]:
-                    response += f"• {trans['id']} - {trans['type']} - {trans['status']}\n"
-            else:
-                response = "لا توجد طلبات سابقة" if lang == 'ar' else "No previous requests"
-            self.send_message(chat_id, response)
-            
-        elif text in ['👤 حسابي', '👤 Profile']:
-            response = f"👤 بياناتك:\n🏷️ الاسم: {user['name']}\n📱 الهاتف: {user['phone']}\n🆔 رقم العميل: {user['customer_id']}\n📅 تاريخ التسجيل: {user['date']}" if lang == 'ar' else f"👤 Your Profile:\n🏷️ Name: {user['name']}\n📱 Phone: {user['phone']}\n🆔 Customer ID: {user['customer_id']}\n📅 Registration: {user['date']}"
-            self.send_message(chat_id, response)
-            
-        elif text in ['📨 شكوى', '📨 Complaint']:
-            comp_id = self.save_complaint(user['customer_id'], 'عام', 'في انتظار التفاصيل')
-            response = f"📨 شكوى جديدة\n🆔 رقم الشكوى: {comp_id}\n\nيرجى إرسال تفاصيل الشكوى" if lang == 'ar' else f"📨 New complaint\n🆔 Complaint ID: {comp_id}\n\nPlease send complaint details"
-            self.send_message(chat_id, response)
-            
+        # معالجة الطلبات عبر جدول التوجيه
+        handler = self.text_handlers.get(text)
+        if handler:
+            handler(chat_id, user, lang)
         else:
             response = "اختر من القائمة أدناه:" if lang == 'ar' else "Please select from the menu below:"
             self.send_message(chat_id, response, self.main_keyboard(lang))
     
+    def handle_deposit(self, chat_id, user, lang):
+        """طلب إيداع جديد"""
+        trans_id = self.save_transaction(user['customer_id'], user['telegram_id'], user['name'], 'deposit', '0')
+        response = f"💰 طلب إيداع جديد\n🆔 رقم المعاملة: {trans_id}\n\nيرجى إرسال المبلغ وصورة الإيصال" if lang == 'ar' else f"💰 New deposit request\n🆔 Transaction: {trans_id}\n\nPlease send amount and receipt image"
+        self.send_message(chat_id, response)
+    
+    def handle_withdraw(self, chat_id, user, lang):
+        """طلب سحب جديد"""
+        trans_id = self.save_transaction(user['customer_id'], user['telegram_id'], user['name'], 'withdraw', '0')
+        response = f"💸 طلب سحب جديد\n🆔 رقم المعاملة: {trans_id}\n\nيرجى إرسال المبلغ وبيانات الحساب" if lang == 'ar' else f"💸 New withdrawal request\n🆔 Transaction: {trans_id}\n\nPlease send amount and account details"
+        self.send_message(chat_id, response)
+    
+    def handle_my_requests(self, chat_id, user, lang):
+        """عرض آخر 5 طلبات"""
+        transactions = self.get_user_transactions(user['customer_id'])
+        if transactions:
+            response = "📋 آخر طلباتك:\n\n" if lang == 'ar' else "📋 Your recent requests:\n\n"
+            for trans in transactions[-5:]:
+                response += f"• {trans['id']} - {trans['type']} - {trans['status']}\n"
+        else:
+            response = "لا توجد طلبات سابقة" if lang == 'ar' else "No previous requests"
+        self.send_message(chat_id, response)
+    
+    def handle_profile(self, chat_id, user, lang):
+        """عرض بيانات الحساب"""
+        response = f"👤 بياناتك:\n🏷️ الاسم: {user['name']}\n📱 الهاتف: {user['phone']}\n🆔 رقم العميل: {user['customer_id']}\n📅 تاريخ التسجيل: {user['date']}" if lang == 'ar' else f"👤 Your Profile:\n🏷️ Name: {user['name']}\n📱 Phone: {user['phone']}\n🆔 Customer ID: {user['customer_id']}\n📅 Registration: {user['date']}"
+        self.send_message(chat_id, response)
+    
+    def handle_complaint(self, chat_id, user, lang):
+        """شكوى جديدة"""
+        comp_id = self.save_complaint(user['customer_id'], 'عام', 'في انتظار التفاصيل')
+        response = f"📨 شكوى جديدة\n🆔 رقم الشكوى: {comp_id}\n\nيرجى إرسال تفاصيل الشكوى" if lang == 'ar' else f"📨 New complaint\n🆔 Complaint ID: {comp_id}\n\nPlease send complaint details"
+        self.send_message(chat_id, response)
+    
     def update_user_language(self, telegram_id, new_lang):
         """تحديث لغة المستخدم"""
         try:
-            # قراءة جميع المستخدمين
-            users = []
-            with open('users.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['telegram_id'] == str(telegram_id):
-                        row['language'] = new_lang
-                    users.append(row)
-            
-            # إعادة كتابة الملف
-            with open('users.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                fieldnames = ['telegram_id', 'name', 'phone', 'customer_id', 'language', 'date']
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(users)
+            self.db.execute('UPDATE users SET language = ? WHERE telegram_id = ?', (new_lang, str(telegram_id)))
         except Exception as e:
             logger.error(f"خطأ في تحديث اللغة: {e}")
     
     def get_user_transactions(self, customer_id):
         """جلب معاملات المستخدم"""
-        transactions = []
-        try:
-            with open('transactions.csv', 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['customer_id'] == customer_id:
-                        transactions.append(row)
-        except:
-            pass
-        return transactions
+        rows = self.db.execute('SELECT * FROM transactions WHERE customer_id = ? ORDER BY date, rowid', (customer_id,))
+        return [dict(row) for row in rows]
+    
+    def dispatch_update(self, update):
+        """توجيه تحديث واحد إلى المعالج المناسب"""
+        if 'message' in update:
+            message = update['message']
+            
+            if 'text' in message:
+                if message['text'] == '/start':
+                    self.handle_start(message)
+                else:
+                    self.handle_text(message)
+            elif 'contact' in message:
+                self.handle_contact(message)
+    
+    def run_webhook(self, public_url, port=8443):
+        """استقبال التحديثات عبر Webhook بدلاً من الاستطلاع"""
+        from aiohttp import web
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # المعالجات متزامنة؛ عامل واحد يحافظ على ترتيب المعالجة كما في وضع الاستطلاع
+        executor = ThreadPoolExecutor(max_workers=1)
+        secret = secrets.token_hex(16)
+        
+        async def webhook(request):
+            if request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret:
+                return web.Response(status=403)
+            
+            update = await request.json()
+            try:
+                await asyncio.get_running_loop().run_in_executor(executor, self.dispatch_update, update)
+            except Exception as e:
+                logger.error(f"خطأ: {e}")
+            return web.Response()
+        
+        result = self.api_call('setWebhook', {'url': public_url, 'secret_token': secret, 'allowed_updates': ALLOWED_UPDATES})
+        if not result or not result.get('ok'):
+            logger.error("❌ تعذر تسجيل Webhook")
+            return
+        
+        app = web.Application()
+        app.router.add_post(urllib.parse.urlsplit(public_url).path or '/', webhook)
+        logger.info(f"🌐 Webhook يعمل على المنفذ {port}")
+        web.run_app(app, port=port)
     
     def run(self):
         """تشغيل البوت"""
@@ -486,26 +688,25 @@ class LangSenseBot:
         logger.info(f"✅ البوت يعمل: @{bot_info['username']}")
         logger.info("📁 البيانات محفوظة في: users.csv, transactions.csv, complaints.csv")
         
+        # وضع Webhook عند تحديد عنوان عام، وإلا الاستطلاع الطويل
+        webhook_url = os.getenv('WEBHOOK_URL')
+        if webhook_url:
+            self.run_webhook(webhook_url, int(os.getenv('WEBHOOK_PORT', '8443')))
+            return
+        
+        # getUpdates لا يعمل مع Webhook مُسجل مسبقاً
+        self.api_call('deleteWebhook')
+        
         while True:
             try:
+                # الطلب ينتظر حتى POLL_TIMEOUT ثانية على الخادم، فلا حاجة للنوم بين الدورات
                 updates = self.get_updates()
                 
                 if updates and updates.get('ok'):
                     for update in updates['result']:
+                        # تقديم الإزاحة قبل المعالجة حتى لا يُعاد تسليم التحديث بعد تعطل
                         self.offset = update['update_id']
-                        
-                        if 'message' in update:
-                            message = update['message']
-                            
-                            if 'text' in message:
-                                if message['text'] == '/start':
-                                    self.handle_start(message)
-                                else:
-                                    self.handle_text(message)
-                            elif 'contact' in message:
-                                self.handle_contact(message)
-                
-                time.sleep(1)
+                        self.dispatch_update(update)
                 
             except KeyboardInterrupt:
                 logger.info("تم إيقاف البوت")
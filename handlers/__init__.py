@@ -1,36 +1,19 @@
 """
 Handler initialization module
+
+Submodules are imported lazily on first access (PEP 562), so importing one
+handler does not load every router and model behind the others.
 """
 
-from . import start
-from . import user_settings
-from . import announcements
-from . import broadcast
-from . import commands
-from . import settings
-from . import balance
-from . import deposit
-from . import financial_operations
-from . import support
-from . import currency
-from . import addresses
-from . import requests
-from . import profile
-from . import admin
-from . import flying_plane_handler
-from . import legacy_handlers
-from . import admin_comprehensive
-from . import wallet
-from . import affiliate
-from . import admin_advanced
-
-__all__ = [
+import importlib
+
+_LAZY_MODULES = (
     "start",
     "user_settings",
     "announcements",
     "broadcast",
     "commands",
-    "settings", 
+    "settings",
     "balance",
     "deposit",
     "financial_operations",
@@ -46,4 +29,19 @@ __all__ = [
     "wallet",
     "affiliate",
     "admin_advanced",
-]
+    "admin_agent_settings",
+)
+
+__all__ = list(_LAZY_MODULES)
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES))
@@ -15,14 +15,75 @@ from aiogram.fsm.context import FSMContext
 from aiogram.filters.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from models import User, WithdrawalAddress
 from utils.keyboards import get_main_menu_keyboard
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# ==================== Keyboards ====================
+
+# لوحات ثابتة تُبنى مرة واحدة عند الاستيراد
+CONFIRM_ADDRESS_KB = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text='✅ نعم، احفظ'), KeyboardButton(text='❌ لا، غير')],
+    ],
+    resize_keyboard=True,
+    one_time_keyboard=True
+)
+NEW_ADDRESS_ROW = [KeyboardButton(text='➕ عنوان جديد')]
+CANCEL_ROW = [KeyboardButton(text='❌ إلغاء')]
+
+
+@lru_cache(maxsize=1024)
+def _addresses_keyboard(labels):
+    """لوحة اختيار العناوين (مخزنة حسب تسميات العناوين)"""
+    buttons = [[KeyboardButton(text=f"✅ {label}")] for label in labels]
+    buttons.append(NEW_ADDRESS_ROW)
+    buttons.append(CANCEL_ROW)
+    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True, one_time_keyboard=True)
+
+# ==================== Cache ====================
+
+class SavedAddress(NamedTuple):
+    """نسخة خفيفة من العنوان المحفوظ لا ترتبط بأي جلسة"""
+    label: Optional[str]
+    address: str
+    created_at: datetime
+
+
+# كاش العناوين المحفوظة لكل مستخدم: telegram_id -> (وقت الانتهاء, العناوين)
+ADDRESS_CACHE_TTL = 300
+ADDRESS_CACHE_MAX_SIZE = 10_000
+_addr_cache = {}
+
+
+def _get_cached_addresses(user_id):
+    """جلب العناوين من الكاش إن كانت صالحة"""
+    entry = _addr_cache.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_addresses(user_id, addresses):
+    """تخزين عناوين المستخدم في الكاش"""
+    if len(_addr_cache) >= ADDRESS_CACHE_MAX_SIZE:
+        # إخراج أقدم إدخال (القاموس يحفظ ترتيب الإضافة)
+        _addr_cache.pop(next(iter(_addr_cache)))
+    _addr_cache[user_id] = (time.monotonic() + ADDRESS_CACHE_TTL, addresses)
+
+
+def invalidate_address_cache(user_id):
+    """إبطال كاش العناوين بعد أي تعديل"""
+    _addr_cache.pop(user_id, None)
+
 # ==================== FSM States ====================
 
 class AddressFlow(StatesGroup):
@@ -35,45 +96,47 @@ class AddressFlow(StatesGroup):
 
 async def show_saved_addresses(message: Message, state: FSMContext, session_maker, for_withdrawal=True):
     """عرض العناوين المحفوظة"""
-    async with session_maker() as session:
-        user = await session.get(User, message.from_user.id)
-        if not user:
-            await message.answer("❌ يجب تسجيل الدخول أولاً")
-            return
-        
-        # جلب العناوين المحفوظة
-        stmt = select(WithdrawalAddress).where(
-            WithdrawalAddress.user_id == message.from_user.id,
-            WithdrawalAddress.is_active == True
-        ).order_by(WithdrawalAddress.created_at.desc())
-        
-        addresses = await session.scalars(stmt)
-        addresses = list(addresses.all())
-        
-        text = "📍 العناوين المحفوظة:\n\n"
-        buttons = []
-        
-        if addresses:
-            # عرض العناوين المحفوظة
-            for i, addr in enumerate(addresses, 1):
-                label = addr.label or f"العنوان {i}"
-                text += f"{i}️⃣ {label}\n"
-                text += f"   📍 {addr.address}\n"
-                text += f"   📅 {addr.created_at.strftime('%Y-%m-%d')}\n\n"
-                
-                button_text = f"✅ {label}"
-                buttons.append([KeyboardButton(text=button_text)])
-        
-        # خيار عنوان جديد
-        text += "➕ أو أضف عنوان جديد"
-        buttons.append([KeyboardButton(text='➕ عنوان جديد')])
-        buttons.append([KeyboardButton(text='❌ إلغاء')])
-        
-        keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True, one_time_keyboard=True)
-        
-        await message.answer(text, reply_markup=keyboard)
-        await state.set_state(AddressFlow.select_address)
-        await state.update_data(addresses=addresses)
+    # الكاش مفهرس بمعرف تيليجرام، فالإصابة لا تلمس قاعدة البيانات إطلاقاً
+    addresses = _get_cached_addresses(message.from_user.id)
+    if addresses is None:
+        async with session_maker() as session:
+            # المستخدم وعناوينه النشطة في استعلام واحد
+            stmt = select(User).where(User.telegram_id == message.from_user.id).options(
+                joinedload(User.withdrawal_addresses.and_(WithdrawalAddress.is_active == True))
+            )
+            result = await session.execute(stmt)
+            user = result.unique().scalar_one_or_none()
+            
+            if not user:
+                await message.answer("❌ يجب تسجيل الدخول أولاً")
+                return
+            
+            addresses = tuple(
+                SavedAddress(addr.label, addr.address, addr.created_at)
+                for addr in user.withdrawal_addresses
+            )
+        _cache_addresses(message.from_user.id, addresses)
+    
+    text = "📍 العناوين المحفوظة:\n\n"
+    labels = []
+    
+    if addresses:
+        # عرض العناوين المحفوظة
+        for i, addr in enumerate(addresses, 1):
+            label = addr.label or f"العنوان {i}"
+            text += f"{i}️⃣ {label}\n"
+            text += f"   📍 {addr.address}\n"
+            text += f"   📅 {addr.created_at.strftime('%Y-%m-%d')}\n\n"
+            labels.append(label)
+    
+    # خيار عنوان جديد
+    text += "➕ أو أضف عنوان جديد"
+    
+    keyboard = _addresses_keyboard(tuple(labels))
+    
+    await message.answer(text, reply_markup=keyboard)
+    await state.set_state(AddressFlow.select_address)
+    await state.update_data(addresses=addresses)
 
 @router.message(AddressFlow.select_address)
 async def select_or_add_address(message: Message, state: FSMContext, session_maker):
@@ -138,15 +201,7 @@ async def confirm_new_address(message: Message, state: FSMContext, session_maker
 
 هل تؤكد حفظ هذا العنوان؟"""
     
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text='✅ نعم، احفظ'), KeyboardButton(text='❌ لا، غير')],
-        ],
-        resize_keyboard=True,
-        one_time_keyboard=True
-    )
-    
-    await message.answer(text, reply_markup=keyboard)
+    await message.answer(text, reply_markup=CONFIRM_ADDRESS_KB)
     await state.set_state(AddressFlow.confirm_address)
     await state.update_data(new_address=address)
 
@@ -173,6 +228,7 @@ async def save_new_address(message: Message, state: FSMContext, session_maker):
         
         session.add(new_addr)
         await session.commit()
+        invalidate_address_cache(message.from_user.id)
         
         user = await session.get(User, message.from_user.id)
         
@@ -4,29 +4,175 @@ Admin handler for administrative functions
 Handles admin panel, user management, language/country management
 """
 
+import asyncio
 import logging
+import time
+from functools import lru_cache, wraps
 from datetime import datetime, timezone
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, update, func, desc, asc, tuple_, bindparam
 
 from models import User, Language, Country, Outbox, OutboxType, OutboxStatus
 from services.i18n import get_text, get_user_language
 from utils.auth import admin_required
+from utils.keyset import encode_cursor, decode_cursor
 from utils.keyboards import (
     get_admin_panel_keyboard, get_admin_users_keyboard,
     get_admin_languages_keyboard, get_admin_countries_keyboard,
-    get_user_management_keyboard, get_pagination_keyboard
+    get_user_management_keyboard, get_cursor_pagination_keyboard
 )
-from config import USERS_PER_PAGE
+from config import USERS_PER_PAGE, ADMIN_STATS_CACHE_TTL, ADMIN_DB_CONCURRENCY
 from handlers.states import AdminStates
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Short-lived admin stats cache; "inflight" lets concurrent misses share one query
+_stats_cache = {"value": None, "expires": 0.0, "inflight": None}
+
+# Rendered languages/countries screens: language -> (expires_at, text, keyboard),
+# dropped whenever a toggle changes the underlying rows
+RENDER_CACHE_TTL = 60
+_lang_render_cache = {}
+_country_render_cache = {}
+
+# Backpressure for DB-heavy admin callbacks (pagination spam, callback floods)
+_admin_db_sem = asyncio.Semaphore(ADMIN_DB_CONCURRENCY)
+
+def bounded(func):
+    """Run the handler while holding a slot of the admin DB semaphore"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with _admin_db_sem:
+            return await func(*args, **kwargs)
+    return wrapper
+
+# Admin screens are Arabic-only, so static texts and keyboards are built once
+_ADMIN_PANEL_KB = get_admin_panel_keyboard("ar")
+
+@lru_cache(maxsize=128)
+def _t(key: str, language: str = "ar") -> str:
+    """Memoized get_text for texts without placeholders"""
+    return get_text(key, language)
+
+_OUTBOX_TYPE_EMOJI = {
+    OutboxType.DEPOSIT: "💰",
+    OutboxType.WITHDRAWAL: "💸",
+    OutboxType.COMPLAINT: "📨",
+    OutboxType.SUPPORT: "🆘"
+}
+
+# ==================== Statements ====================
+# Built once at import; per-call values are bind parameters so every
+# execution reuses the same compiled statement.
+
+_ADMIN_STATS_STMT = select(
+    func.count(User.id),
+    func.count(User.id).filter(User.is_active == True),
+    select(func.count(Outbox.id)).where(Outbox.status == OutboxStatus.PENDING).scalar_subquery()
+)
+
+# Only the columns the users list shows (plain rows, no ORM identity map);
+# the total rides along as a scalar subquery, so each page is one round-trip
+_USERS_PAGE_BASE = select(
+    User.id, User.telegram_id, User.first_name, User.last_name, User.username,
+    User.customer_code, User.language_code, User.country_code, User.created_at,
+    User.is_active, User.is_banned, User.is_admin,
+    select(func.count(User.id)).scalar_subquery().label("total")
+)
+_USERS_KEY = tuple_(User.created_at, User.id)
+_USERS_CURSOR = tuple_(
+    bindparam("cursor_ts", type_=User.created_at.type),
+    bindparam("cursor_id", type_=User.id.type)
+)
+_USERS_FIRST_PAGE_STMT = (
+    _USERS_PAGE_BASE
+    .order_by(desc(User.created_at), desc(User.id))
+    .limit(bindparam("limit"))
+)
+_USERS_AFTER_STMT = (
+    _USERS_PAGE_BASE
+    .where(_USERS_KEY < _USERS_CURSOR)
+    .order_by(desc(User.created_at), desc(User.id))
+    .limit(bindparam("limit"))
+)
+_USERS_BEFORE_STMT = (
+    _USERS_PAGE_BASE
+    .where(_USERS_KEY > _USERS_CURSOR)
+    .order_by(asc(User.created_at), asc(User.id))
+    .limit(bindparam("limit"))
+)
+
+_LANGUAGES_STMT = select(Language).order_by(Language.name)
+_COUNTRIES_STMT = select(Country).order_by(Country.name)
+_PENDING_OUTBOX_STMT = (
+    select(Outbox)
+    .where(Outbox.status == OutboxStatus.PENDING)
+    .order_by(desc(Outbox.created_at))
+    .limit(10)
+)
+
+def _format_users(users) -> str:
+    """Format user rows for the admin users list"""
+    parts = []
+    for user in users:
+        status = "🟢" if user.is_active else "🔴"
+        banned = "🚫" if user.is_banned else ""
+        admin_mark = "👑" if user.is_admin else ""
+        last_name = f" {user.last_name}" if user.last_name else ""
+        username = f" (@{user.username})" if user.username else ""
+        
+        parts.append(
+            f"\n\n{status} {admin_mark} {banned}\n"
+            f"ID: {user.telegram_id}\n"
+            f"Name: {user.first_name}{last_name}{username}"
+            f"\nCustomer: {user.customer_code or 'N/A'}"
+            f"\nLang: {user.language_code} | Country: {user.country_code}"
+            f"\nJoined: {user.created_at.isoformat()[:10]}"
+        )
+    return "".join(parts)
+
+async def fetch_admin_stats(session: AsyncSession):
+    """Return (total_users, active_users, pending_requests) in a single query"""
+    result = await session.execute(_ADMIN_STATS_STMT)
+    return tuple(result.one())
+
+async def get_admin_stats(session: AsyncSession):
+    """Return cached admin stats, refreshing them at most once per TTL"""
+    if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires"]:
+        return _stats_cache["value"]
+    
+    while (inflight := _stats_cache["inflight"]) is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                raise  # this caller itself was cancelled
+            # The refreshing caller was cancelled; take over the refresh
+    
+    future = asyncio.get_running_loop().create_future()
+    _stats_cache["inflight"] = future
+    try:
+        value = await fetch_admin_stats(session)
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    except BaseException:
+        future.cancel()  # never leave waiters on an unresolved future
+        raise
+    finally:
+        _stats_cache["inflight"] = None
+    
+    future.set_result(value)
+    _stats_cache["value"] = value
+    _stats_cache["expires"] = time.monotonic() + ADMIN_STATS_CACHE_TTL
+    return value
+
 @router.message(Command("admin"))
 @admin_required
 async def show_admin_panel(message: Message, session_maker):
@@ -34,15 +180,10 @@ async def show_admin_panel(message: Message, session_maker):
     async with session_maker() as session:
         try:
             # Get statistics
-            total_users = await session.scalar(select(func.count(User.id)))
-            active_users = await session.scalar(
-                select(func.count(User.id)).where(User.is_active == True)
-            )
-            pending_requests = await session.scalar(
-                select(func.count(Outbox.id)).where(Outbox.status == OutboxStatus.PENDING)
-            )
+            total_users, active_users, pending_requests = await get_admin_stats(session)
             
-            admin_text = get_text("admin_panel", "ar").format(
+            admin_text = get_text(
+                "admin_panel", "ar",
                 total_users=total_users,
                 active_users=active_users,
                 pending_requests=pending_requests
@@ -50,12 +191,12 @@ async def show_admin_panel(message: Message, session_maker):
             
             await message.answer(
                 admin_text,
-                reply_markup=get_admin_panel_keyboard("ar")
+                reply_markup=_ADMIN_PANEL_KB
             )
             
         except Exception as e:
             logger.error(f"Error showing admin panel: {e}")
-            await message.answer(get_text("error_occurred", "ar"))
+            await message.answer(_t("error_occurred"))
 
 @router.callback_query(F.data == "admin_users")
 @admin_required
@@ -63,61 +204,69 @@ async def show_users_list(callback: CallbackQuery, session_maker):
     """Show users list with pagination"""
     await show_users_page(callback, session_maker, 0)
 
-@router.callback_query(F.data.startswith("admin_users_page_"))
+@router.callback_query(F.data.startswith("admin_users_after_") | F.data.startswith("admin_users_before_"))
 @admin_required
+@bounded
 async def show_users_page(callback: CallbackQuery, session_maker, page: int = None):
-    """Show specific page of users"""
+    """Show specific page of users (keyset pagination on created_at, id)"""
     async with session_maker() as session:
         try:
+            direction = None
             if page is None:
-                page = int(callback.data.split("_")[-1])
-            
-            offset = page * USERS_PER_PAGE
-            
-            # Get users with pagination
-            result = await session.execute(
-                select(User)
-                .order_by(desc(User.created_at))
-                .offset(offset)
-                .limit(USERS_PER_PAGE)
-            )
-            users = result.scalars().all()
-            
-            # Get total count for pagination
-            total_users = await session.scalar(select(func.count(User.id)))
+                # admin_users_<after|before>_<page>_<micros>_<id>
+                _, _, direction, page, cursor = callback.data.split("_", 4)
+                page = int(page)
+                cursor = decode_cursor(cursor)
+            
+            # One extra row tells whether another page exists in the direction of travel
+            params = {"limit": USERS_PER_PAGE + 1}
+            if direction == "after":
+                stmt = _USERS_AFTER_STMT
+            elif direction == "before":
+                stmt = _USERS_BEFORE_STMT
+            else:
+                stmt = _USERS_FIRST_PAGE_STMT
+            if direction:
+                params["cursor_ts"], params["cursor_id"] = cursor
+            
+            result = await session.execute(stmt, params)
+            rows = result.all()
+            has_more = len(rows) > USERS_PER_PAGE
+            rows = rows[:USERS_PER_PAGE]
+            if direction == "before":
+                rows.reverse()
+            users = rows
+            
+            if direction == "before":
+                has_prev, has_next = has_more, True
+            else:
+                has_prev, has_next = page > 0, has_more
+            
+            total_users = rows[0].total if rows else 0
             total_pages = (total_users + USERS_PER_PAGE - 1) // USERS_PER_PAGE
             
             if not users:
                 await callback.message.edit_text(
-                    get_text("no_users_found", "ar")
+                    _t("no_users_found")
                 )
                 await callback.answer()
                 return
             
             # Format users list
-            users_text = get_text("users_list_header", "ar").format(
+            header = get_text(
+                "users_list_header", "ar",
                 page=page + 1,
                 total_pages=total_pages,
                 total_users=total_users
             )
+            users_text = header + _format_users(users)
             
-            for user in users:
-                status = "🟢" if user.is_active else "🔴"
-                banned = "🚫" if user.is_banned else ""
-                admin_mark = "👑" if user.is_admin else ""
-                
-                users_text += f"\n\n{status} {admin_mark} {banned}\n"
-                users_text += f"ID: {user.telegram_id}\n"
-                users_text += f"Name: {user.first_name}"
-                if user.last_name:
-                    users_text += f" {user.last_name}"
-                if user.username:
-                    users_text += f" (@{user.username})"
-                users_text += f"\nCustomer: {user.customer_code or 'N/A'}"
-                users_text += f"\nLang: {user.language_code} | Country: {user.country_code}"
-                users_text += f"\nJoined: {user.created_at.strftime('%Y-%m-%d')}"
-            
-            keyboard = get_pagination_keyboard("admin_users", page, total_pages, "ar")
+            keyboard = get_cursor_pagination_keyboard(
+                "admin_users", page, total_pages,
+                encode_cursor(users[0].created_at, users[0].id) if has_prev else None,
+                encode_cursor(users[-1].created_at, users[-1].id) if has_next else None,
+                "ar"
+            )
             
             await callback.message.edit_text(
                 users_text,
@@ -127,142 +276,145 @@ async def show_users_page(callback: CallbackQuery, session_maker, page: int = No
             
         except Exception as e:
             logger.error(f"Error showing users page: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+            await callback.answer(_t("error_occurred"))
+
+async def render_languages_list(session: AsyncSession):
+    """Build (text, keyboard) for the languages management screen"""
+    result = await session.execute(_LANGUAGES_STMT)
+    languages = result.scalars().all()
+    
+    if not languages:
+        return _t("no_languages_found"), get_admin_languages_keyboard([], "ar")
+    
+    # Format languages list
+    parts = [_t("languages_list")]
+    
+    for lang in languages:
+        status = "✅" if lang.is_active else "❌"
+        rtl_mark = "🔄" if lang.rtl else ""
+        
+        parts.append(
+            f"\n\n{status} {rtl_mark}\n"
+            f"Code: {lang.code}\n"
+            f"Name: {lang.name}\n"
+            f"Native: {lang.native_name}\n"
+            f"RTL: {'Yes' if lang.rtl else 'No'}\n"
+            f"Created: {lang.created_at.isoformat()[:10]}"
+        )
+    
+    return "".join(parts), get_admin_languages_keyboard(languages, "ar")
+
+async def render_countries_list(session: AsyncSession):
+    """Build (text, keyboard) for the countries management screen"""
+    result = await session.execute(_COUNTRIES_STMT)
+    countries = result.scalars().all()
+    
+    if not countries:
+        return _t("no_countries_found"), get_admin_countries_keyboard([], "ar")
+    
+    # Format countries list
+    parts = [_t("countries_list")]
+    
+    for country in countries:
+        status = "✅" if country.is_active else "❌"
+        
+        parts.append(
+            f"\n\n{status}\n"
+            f"Code: {country.code}\n"
+            f"Name: {country.name}\n"
+            f"Native: {country.native_name}\n"
+            f"Phone: {country.phone_prefix}\n"
+            f"Created: {country.created_at.isoformat()[:10]}"
+        )
+    
+    return "".join(parts), get_admin_countries_keyboard(countries, "ar")
+
+async def get_rendered(cache: dict, language: str, session_maker, render):
+    """Return cached (text, keyboard) for a screen, rendering it on a miss"""
+    entry = cache.get(language)
+    if entry and time.monotonic() < entry[0]:
+        return entry[1], entry[2]
+    
+    async with session_maker() as session:
+        text, keyboard = await render(session)
+    store_rendered(cache, language, text, keyboard)
+    return text, keyboard
+
+def store_rendered(cache: dict, language: str, text: str, keyboard):
+    """Put a freshly rendered screen into its cache"""
+    cache[language] = (time.monotonic() + RENDER_CACHE_TTL, text, keyboard)
 
 @router.callback_query(F.data == "admin_languages")
 @admin_required
+@bounded
 async def show_languages_management(callback: CallbackQuery, session_maker):
     """Show languages management"""
-    async with session_maker() as session:
-        try:
-            # Get all languages
-            result = await session.execute(
-                select(Language).order_by(Language.name)
-            )
-            languages = result.scalars().all()
-            
-            if not languages:
-                await callback.message.edit_text(
-                    get_text("no_languages_found", "ar"),
-                    reply_markup=get_admin_languages_keyboard([], "ar")
-                )
-                await callback.answer()
-                return
-            
-            # Format languages list
-            languages_text = get_text("languages_list", "ar")
-            
-            for lang in languages:
-                status = "✅" if lang.is_active else "❌"
-                rtl_mark = "🔄" if lang.rtl else ""
-                
-                languages_text += f"\n\n{status} {rtl_mark}\n"
-                languages_text += f"Code: {lang.code}\n"
-                languages_text += f"Name: {lang.name}\n"
-                languages_text += f"Native: {lang.native_name}\n"
-                languages_text += f"RTL: {'Yes' if lang.rtl else 'No'}\n"
-                languages_text += f"Created: {lang.created_at.strftime('%Y-%m-%d')}"
-            
-            await callback.message.edit_text(
-                languages_text,
-                reply_markup=get_admin_languages_keyboard(languages, "ar")
-            )
-            await callback.answer()
-            
-        except Exception as e:
-            logger.error(f"Error showing languages: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+    try:
+        text, keyboard = await get_rendered(_lang_render_cache, "ar", session_maker, render_languages_list)
+        await callback.message.edit_text(text, reply_markup=keyboard)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error showing languages: {e}")
+        await callback.answer(_t("error_occurred"))
 
 @router.callback_query(F.data == "admin_countries")
 @admin_required
+@bounded
 async def show_countries_management(callback: CallbackQuery, session_maker):
     """Show countries management"""
-    async with session_maker() as session:
-        try:
-            # Get all countries
-            result = await session.execute(
-                select(Country).order_by(Country.name)
-            )
-            countries = result.scalars().all()
-            
-            if not countries:
-                await callback.message.edit_text(
-                    get_text("no_countries_found", "ar"),
-                    reply_markup=get_admin_countries_keyboard([], "ar")
-                )
-                await callback.answer()
-                return
-            
-            # Format countries list
-            countries_text = get_text("countries_list", "ar")
-            
-            for country in countries:
-                status = "✅" if country.is_active else "❌"
-                
-                countries_text += f"\n\n{status}\n"
-                countries_text += f"Code: {country.code}\n"
-                countries_text += f"Name: {country.name}\n"
-                countries_text += f"Native: {country.native_name}\n"
-                countries_text += f"Phone: {country.phone_prefix}\n"
-                countries_text += f"Created: {country.created_at.strftime('%Y-%m-%d')}"
-            
-            await callback.message.edit_text(
-                countries_text,
-                reply_markup=get_admin_countries_keyboard(countries, "ar")
-            )
-            await callback.answer()
-            
-        except Exception as e:
-            logger.error(f"Error showing countries: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+    try:
+        text, keyboard = await get_rendered(_country_render_cache, "ar", session_maker, render_countries_list)
+        await callback.message.edit_text(text, reply_markup=keyboard)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error showing countries: {e}")
+        await callback.answer(_t("error_occurred"))
 
 @router.callback_query(F.data == "admin_outbox")
 @admin_required
+@bounded
 async def show_outbox_management(callback: CallbackQuery, session_maker):
     """Show outbox/requests management"""
     async with session_maker() as session:
         try:
             # Get pending requests
-            result = await session.execute(
-                select(Outbox)
-                .where(Outbox.status == OutboxStatus.PENDING)
-                .order_by(desc(Outbox.created_at))
-                .limit(10)
-            )
+            result = await session.execute(_PENDING_OUTBOX_STMT)
             requests = result.scalars().all()
             
             if not requests:
                 await callback.message.edit_text(
-                    get_text("no_pending_requests", "ar")
+                    _t("no_pending_requests")
                 )
                 await callback.answer()
                 return
             
             # Format requests list
-            requests_text = get_text("pending_requests_header", "ar")
+            parts = [_t("pending_requests_header")]
             
             for req in requests:
-                type_emoji = {
-                    OutboxType.DEPOSIT: "💰",
-                    OutboxType.WITHDRAWAL: "💸", 
-                    OutboxType.COMPLAINT: "📨",
-                    OutboxType.SUPPORT: "🆘"
-                }.get(req.type, "📄")
+                type_emoji = _OUTBOX_TYPE_EMOJI.get(req.type, "📄")
+                subject = f"Subject: {req.subject}\n" if req.subject else ""
+                content = f"{req.content[:100]}..." if len(req.content) > 100 else req.content
                 
-                requests_text += f"\n\n{type_emoji} ID: {req.id}\n"
-                requests_text += f"Type: {req.type.value.title()}\n"
-                requests_text += f"User ID: {req.user_id}\n"
-                if req.subject:
-                    requests_text += f"Subject: {req.subject}\n"
-                requests_text += f"Content: {req.content[:100]}...\n" if len(req.content) > 100 else f"Content: {req.content}\n"
-                requests_text += f"Created: {req.created_at.strftime('%Y-%m-%d %H:%M')}"
+                parts.append(
+                    f"\n\n{type_emoji} ID: {req.id}\n"
+                    f"Type: {req.type.value.title()}\n"
+                    f"User ID: {req.user_id}\n"
+                    f"{subject}"
+                    f"Content: {content}\n"
+                    f"Created: {req.created_at.isoformat(' ', 'minutes')[:16]}"
+                )
+            
+            requests_text = "".join(parts)
             
             await callback.message.edit_text(requests_text)
             await callback.answer()
             
         except Exception as e:
             logger.error(f"Error showing outbox: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+            await callback.answer(_t("error_occurred"))
 
 @router.callback_query(F.data.startswith("toggle_lang_"))
 @admin_required
@@ -270,32 +422,37 @@ async def toggle_language_status(callback: CallbackQuery, session_maker):
     """Toggle language active status"""
     async with session_maker() as session:
         try:
-            lang_id = int(callback.data.split("_")[-1])
+            lang_id = int(callback.data.removeprefix("toggle_lang_"))
             
-            # Get language
+            # Toggle status in a single UPDATE ... RETURNING
             result = await session.execute(
-                select(Language).where(Language.id == lang_id)
+                update(Language)
+                .where(Language.id == lang_id)
+                .values(is_active=~Language.is_active, updated_at=datetime.now(timezone.utc))
+                .returning(Language.name, Language.is_active)
             )
-            language = result.scalar_one_or_none()
+            language = result.first()
             
             if not language:
-                await callback.answer(get_text("language_not_found", "ar"))
+                await callback.answer(_t("language_not_found"))
                 return
             
-            # Toggle status
-            language.is_active = not language.is_active
-            language.updated_at = datetime.now(timezone.utc)
             await session.commit()
+            _lang_render_cache.clear()
             
-            status = "activated" if language.is_active else "deactivated"
-            await callback.answer(f"Language {language.name} {status}")
+            # Re-render on the same session, then acknowledge and refresh concurrently
+            text, keyboard = await render_languages_list(session)
+            store_rendered(_lang_render_cache, "ar", text, keyboard)
             
-            # Refresh the languages list
-            await show_languages_management(callback, session_maker)
+            status = "activated" if language.is_active else "deactivated"
+            await asyncio.gather(
+                callback.answer(f"Language {language.name} {status}"),
+                callback.message.edit_text(text, reply_markup=keyboard)
+            )
             
         except Exception as e:
             logger.error(f"Error toggling language: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+            await callback.answer(_t("error_occurred"))
 
 @router.callback_query(F.data.startswith("toggle_country_"))
 @admin_required
@@ -303,32 +460,37 @@ async def toggle_country_status(callback: CallbackQuery, session_maker):
     """Toggle country active status"""
     async with session_maker() as session:
         try:
-            country_id = int(callback.data.split("_")[-1])
+            country_id = int(callback.data.removeprefix("toggle_country_"))
             
-            # Get country
+            # Toggle status in a single UPDATE ... RETURNING
             result = await session.execute(
-                select(Country).where(Country.id == country_id)
+                update(Country)
+                .where(Country.id == country_id)
+                .values(is_active=~Country.is_active, updated_at=datetime.now(timezone.utc))
+                .returning(Country.name, Country.is_active)
             )
-            country = result.scalar_one_or_none()
+            country = result.first()
             
             if not country:
-                await callback.answer(get_text("country_not_found", "ar"))
+                await callback.answer(_t("country_not_found"))
                 return
             
-            # Toggle status
-            country.is_active = not country.is_active
-            country.updated_at = datetime.now(timezone.utc)
             await session.commit()
+            _country_render_cache.clear()
             
-            status = "activated" if country.is_active else "deactivated"
-            await callback.answer(f"Country {country.name} {status}")
+            # Re-render on the same session, then acknowledge and refresh concurrently
+            text, keyboard = await render_countries_list(session)
+            store_rendered(_country_render_cache, "ar", text, keyboard)
             
-            # Refresh the countries list
-            await show_countries_management(callback, session_maker)
+            status = "activated" if country.is_active else "deactivated"
+            await asyncio.gather(
+                callback.answer(f"Country {country.name} {status}"),
+                callback.message.edit_text(text, reply_markup=keyboard)
+            )
             
         except Exception as e:
             logger.error(f"Error toggling country: {e}")
-            await callback.answer(get_text("error_occurred", "ar"))
+            await callback.answer(_t("error_occurred"))
 
 @router.callback_query(F.data == "back_to_admin")
 @admin_required
@@ -3,58 +3,115 @@
 إدارة المستخدمين، العمولات، أرصدة المحافظ، وتغيير العملات
 """
 
-from aiogram import Router, F
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import Router, F, BaseMiddleware
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
 from models import (
     User, Wallet, Affiliate, AffiliateCommission, AffiliatePayout, 
     AffiliateStatus, OutboxStatus as TransactionStatus, PaymentMethod, PaymentMethodStatus
 )
+from collections import defaultdict
 from datetime import datetime
 import logging
 
+from handlers.states import AdminStates
+
 logger = logging.getLogger(__name__)
 router = Router()
 
 # Admin User IDs - معرفات الإداريين
-ADMIN_IDS = [7146701713]  # معرف المسؤول الرئيسي
+ADMIN_IDS = frozenset({7146701713})  # معرف المسؤول الرئيسي
+
+DASHBOARD_BUTTON = '⚙️ لوحة التحكم'
+
+
+class AdminOnlyMiddleware(BaseMiddleware):
+    """تجاهل أي حدث في هذا الراوتر من غير الإداريين (فحص واحد بدلاً من فحص في كل معالج)"""
+    
+    async def __call__(
+        self,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.from_user is None or event.from_user.id not in ADMIN_IDS:
+            # رسالة الرفض تظهر فقط عند محاولة فتح لوحة التحكم نفسها
+            if isinstance(event, Message) and event.text == DASHBOARD_BUTTON:
+                await event.answer("❌ أنت لا تملك صلاحية الوصول")
+            return None
+        return await handler(event, data)
 
 
-class AdminStates(StatesGroup):
-    """حالات البحث في لوحة التحكم"""
-    searching_user = State()
-    viewing_user = State()
-    changing_user_currency = State()
-    changing_user_balance = State()
-    viewing_affiliate_stats = State()
-    approving_commission = State()
+router.message.middleware(AdminOnlyMiddleware())
+router.callback_query.middleware(AdminOnlyMiddleware())
+
+
+async def load_wallets_for_users(session: AsyncSession, user_ids):
+    """جلب المحافظ النشطة لعدة مستخدمين باستعلام IN واحد: user_id -> [صفوف المحافظ]"""
+    wallets = defaultdict(list)
+    if not user_ids:
+        return wallets
+    
+    stmt = select(Wallet.user_id, Wallet.currency, Wallet.balance, Wallet.frozen_amount).where(
+        Wallet.user_id.in_(user_ids), Wallet.is_active == True
+    )
+    for row in await session.execute(stmt):
+        wallets[row.user_id].append(row)
+    return wallets
+
+
+# سطر المحفظة في تفاصيل المستخدم
+_WALLET_FMT = "💰 {0}: {1:,.2f} ر.س (مجمد: {2:,.2f})".format
+
+
+# ==================== KEYBOARDS ====================
+
+# لوحات ثابتة تُبنى مرة واحدة عند الاستيراد
+_DASHBOARD_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='👥 إدارة المستخدمين'), KeyboardButton(text='💰 إدارة الأرصدة')],
+    [KeyboardButton(text='🤝 إدارة الوكلاء'), KeyboardButton(text='💵 إدارة العمولات')],
+    [KeyboardButton(text='🏦 طرق الدفع'), KeyboardButton(text='📊 التقارير')],
+    [KeyboardButton(text='🏠 القائمة الرئيسية')],
+], resize_keyboard=True)
+_USER_DETAILS_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='💰 تغيير الرصيد'), KeyboardButton(text='💱 تغيير العملة')],
+    [KeyboardButton(text='🔒 حظر/فتح'), KeyboardButton(text='🗑️ حذف')],
+    [KeyboardButton(text='⬅️ رجوع'), KeyboardButton(text='🏠 القائمة الرئيسية')],
+], resize_keyboard=True)
+_CURRENCY_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='🇸🇦 SAR'), KeyboardButton(text='🇺🇸 USD'), KeyboardButton(text='🇪🇺 EUR')],
+    [KeyboardButton(text='🇦🇪 AED'), KeyboardButton(text='🇪🇬 EGP'), KeyboardButton(text='🇰🇼 KWD')],
+    [KeyboardButton(text='⬅️ رجوع')],
+], resize_keyboard=True)
+_AFFILIATE_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='👀 عرض جميع الوكلاء')],
+    [KeyboardButton(text='🔍 البحث عن وكيل')],
+    [KeyboardButton(text='⬅️ رجوع')],
+], resize_keyboard=True)
+_COMMISSION_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='⏳ عرض المعلقة'), KeyboardButton(text='✅ الموافقة')],
+    [KeyboardButton(text='💳 طلبات السحب'), KeyboardButton(text='📊 التقرير')],
+    [KeyboardButton(text='⬅️ رجوع')],
+], resize_keyboard=True)
+_PAYMENT_METHODS_KB = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='➕ إضافة طريقة'), KeyboardButton(text='✏️ تعديل')],
+    [KeyboardButton(text='⬅️ رجوع')],
+], resize_keyboard=True)
 
 
 # ==================== MAIN ADMIN DASHBOARD ====================
 
-@router.message(F.text == '⚙️ لوحة التحكم')
+@router.message(F.text == DASHBOARD_BUTTON)
 async def admin_dashboard(message: Message):
     """عرض لوحة التحكم الرئيسية"""
-    # التحقق من أن المستخدم إداري
-    if message.from_user.id not in ADMIN_IDS:
-        await message.answer("❌ أنت لا تملك صلاحية الوصول")
-        return
-    
     text = """⚙️ **لوحة التحكم الإدارية**
 
 اختر ما تريد إدارته:"""
     
-    keyboard = [
-        [KeyboardButton(text='👥 إدارة المستخدمين'), KeyboardButton(text='💰 إدارة الأرصدة')],
-        [KeyboardButton(text='🤝 إدارة الوكلاء'), KeyboardButton(text='💵 إدارة العمولات')],
-        [KeyboardButton(text='🏦 طرق الدفع'), KeyboardButton(text='📊 التقارير')],
-        [KeyboardButton(text='🏠 القائمة الرئيسية')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_DASHBOARD_KB)
 
 
 # ==================== USER MANAGEMENT ====================
@@ -62,12 +119,9 @@ async def admin_dashboard(message: Message):
 @router.message(F.text == '👥 إدارة المستخدمين')
 async def user_management(message: Message, state: FSMContext):
     """إدارة المستخدمين"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     text = """👥 **إدارة المستخدمين**
 
-أدخل معرف المستخدم أو رقم الهاتف للبحث:"""
+أدخل معرف تليجرام أو رمز العميل للبحث:"""
     
     await message.answer(text)
     await state.set_state(AdminStates.searching_user)
@@ -76,16 +130,15 @@ async def user_management(message: Message, state: FSMContext):
 @router.message(AdminStates.searching_user)
 async def search_user(message: Message, state: FSMContext, session: AsyncSession):
     """البحث عن مستخدم"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     search_query = message.text.strip()
     
-    # البحث برقم تليجرام أو الهاتف
-    stmt = select(User).where(
-        (User.telegram_id == int(search_query) if search_query.isdigit() else False) |
-        (User.phone == search_query)
-    )
+    # بحث نقطي واحد على عمود مفهرس حسب نوع المدخل:
+    # أرقام فقط -> معرف تليجرام، وغير ذلك -> رمز العميل
+    # (الهاتف مخزن مشفراً في phone_encrypted ولا يمكن مطابقته مباشرة)
+    if search_query.isdigit():
+        stmt = select(User).where(User.telegram_id == int(search_query))
+    else:
+        stmt = select(User).where(User.customer_code == search_query)
     
     user = await session.scalar(stmt)
     
@@ -101,14 +154,10 @@ async def search_user(message: Message, state: FSMContext, session: AsyncSession
 
 async def show_user_details(message: Message, session: AsyncSession, user: User):
     """عرض تفاصيل المستخدم"""
-    # جلب المحافظ
-    stmt = select(Wallet).where(Wallet.user_id == user.id, Wallet.is_active == True)
-    wallets = await session.scalars(stmt)
+    # جلب المحافظ (الأعمدة المعروضة فقط، والعدد يُحسب من نفس النتيجة)
+    wallets = (await load_wallets_for_users(session, [user.id]))[user.id]
     
-    wallets_info = "\n".join([
-        f"💰 {w.currency}: {w.balance:,.2f} ر.س (مجمد: {w.frozen_amount:,.2f})"
-        for w in wallets
-    ])
+    wallets_info = "\n".join(_WALLET_FMT(w.currency, w.balance, w.frozen_amount) for w in wallets)
     
     text = f"""👤 **تفاصيل المستخدم**
 
@@ -124,25 +173,16 @@ async def show_user_details(message: Message, session: AsyncSession, user: User)
 {wallets_info or 'لا توجد محافظ'}
 
 📊 **الإحصائيات:**
-• العمليات: {len(await session.scalars(select(func.count(Wallet.id))))}
+• العمليات: {len(wallets)}
 
 اختر العملية:"""
     
-    keyboard = [
-        [KeyboardButton(text='💰 تغيير الرصيد'), KeyboardButton(text='💱 تغيير العملة')],
-        [KeyboardButton(text='🔒 حظر/فتح'), KeyboardButton(text='🗑️ حذف')],
-        [KeyboardButton(text='⬅️ رجوع'), KeyboardButton(text='🏠 القائمة الرئيسية')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_USER_DETAILS_KB)
 
 
 @router.message(F.text == '💰 تغيير الرصيد')
 async def change_user_balance(message: Message, state: FSMContext):
     """تغيير رصيد المستخدم"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     text = """💰 **تغيير الرصيد**
 
 أدخل المبلغ والعملة:
@@ -155,9 +195,6 @@ async def change_user_balance(message: Message, state: FSMContext):
 @router.message(AdminStates.changing_user_balance)
 async def process_balance_change(message: Message, state: FSMContext, session: AsyncSession):
     """معالجة تغيير الرصيد"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     try:
         # مثال: "500 SAR" أو "-200 USD"
         parts = message.text.split()
@@ -201,29 +238,17 @@ async def process_balance_change(message: Message, state: FSMContext, session: A
 @router.message(F.text == '💱 تغيير العملة')
 async def change_user_currency(message: Message, state: FSMContext):
     """تغيير عملة المستخدم الأساسية"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     text = """💱 **تغيير العملة**
 
 اختر العملة الجديدة:"""
     
-    keyboard = [
-        [KeyboardButton(text='🇸🇦 SAR'), KeyboardButton(text='🇺🇸 USD'), KeyboardButton(text='🇪🇺 EUR')],
-        [KeyboardButton(text='🇦🇪 AED'), KeyboardButton(text='🇪🇬 EGP'), KeyboardButton(text='🇰🇼 KWD')],
-        [KeyboardButton(text='⬅️ رجوع')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_CURRENCY_KB)
     await state.set_state(AdminStates.changing_user_currency)
 
 
 @router.message(AdminStates.changing_user_currency)
 async def process_currency_change(message: Message, state: FSMContext, session: AsyncSession):
     """معالجة تغيير العملة"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     # استخراج رمز العملة من الرسالة
     currency = message.text.split()[-1].upper() if ' ' in message.text else message.text.upper()
     
@@ -244,9 +269,6 @@ async def process_currency_change(message: Message, state: FSMContext, session:
 @router.message(F.text == '🤝 إدارة الوكلاء')
 async def affiliate_management(message: Message, session: AsyncSession):
     """إدارة الوكلاء"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     # إحصائيات الوكلاء
     stmt = select(func.count(Affiliate.id)).where(
         Affiliate.status == AffiliateStatus.ACTIVE
@@ -264,13 +286,7 @@ async def affiliate_management(message: Message, session: AsyncSession):
 
 اختر:"""
     
-    keyboard = [
-        [KeyboardButton(text='👀 عرض جميع الوكلاء')],
-        [KeyboardButton(text='🔍 البحث عن وكيل')],
-        [KeyboardButton(text='⬅️ رجوع')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_AFFILIATE_KB)
 
 
 # ==================== COMMISSION MANAGEMENT ====================
@@ -278,15 +294,11 @@ async def affiliate_management(message: Message, session: AsyncSession):
 @router.message(F.text == '💵 إدارة العمولات')
 async def commission_management(message: Message, session: AsyncSession):
     """إدارة العمولات"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     # جلب العمولات المعلقة
-    stmt = select(AffiliateCommission).where(
+    count_stmt = select(func.count(AffiliateCommission.id)).where(
         AffiliateCommission.status == TransactionStatus.PENDING
     )
-    pending = await session.scalars(stmt)
-    pending_count = len(await session.scalars(stmt))
+    pending_count = await session.scalar(count_stmt) or 0
     
     text = f"""💵 **إدارة العمولات**
 
@@ -294,13 +306,7 @@ async def commission_management(message: Message, session: AsyncSession):
 
 اختر:"""
     
-    keyboard = [
-        [KeyboardButton(text='⏳ عرض المعلقة'), KeyboardButton(text='✅ الموافقة')],
-        [KeyboardButton(text='💳 طلبات السحب'), KeyboardButton(text='📊 التقرير')],
-        [KeyboardButton(text='⬅️ رجوع')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_COMMISSION_KB)
 
 
 # ==================== PAYMENT METHODS ====================
@@ -308,9 +314,6 @@ async def commission_management(message: Message, session: AsyncSession):
 @router.message(F.text == '🏦 طرق الدفع')
 async def manage_payment_methods(message: Message, session: AsyncSession):
     """إدارة طرق الدفع"""
-    if message.from_user.id not in ADMIN_IDS:
-        return
-    
     # جلب طرق الدفع
     stmt = select(PaymentMethod).order_by(PaymentMethod.order)
     methods = await session.scalars(stmt)
@@ -327,9 +330,4 @@ async def manage_payment_methods(message: Message, session: AsyncSession):
 
 اختر:"""
     
-    keyboard = [
-        [KeyboardButton(text='➕ إضافة طريقة'), KeyboardButton(text='✏️ تعديل')],
-        [KeyboardButton(text='⬅️ رجوع')],
-    ]
-    
-    await message.answer(text, reply_markup=ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True))
+    await message.answer(text, reply_markup=_PAYMENT_METHODS_KB)
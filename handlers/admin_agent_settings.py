@@ -9,44 +9,134 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, C
 from aiogram.filters import Command
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.orm import load_only
 
 from models import Agent, Outbox, OutboxStatus, AuditLog
 from services.system_settings_service import (
     SystemSettingsService, 
     SettingKey,
     get_agent_distribution_mode,
-    is_agent_distribution_enabled
+    get_agent_distribution_settings,
 )
 from services.agent_distribution_service import AgentDistributionService
-from services.audit_log_service import AuditLogService
+from services.audit_log_service import AuditLogService, AuditCategory
 from utils.auth import admin_required
+from utils.callback_dedup import CallbackDedupMiddleware
 from services.i18n import get_text
 
 router = Router()
-
-
-@router.message(Command('agent_settings'))
-@admin_required
-async def agent_settings_menu(message: Message, session_maker):
-    """Show agent distribution settings menu"""
+router.callback_query.middleware(CallbackDedupMiddleware())
+
+# Upper bound on rows the active-agents badge count will scan
+ACTIVE_AGENTS_COUNT_CAP = 1000
+
+# Agents per page in list_agents; ~250 chars each keeps a page under Telegram's 4096 limit
+AGENTS_PER_PAGE = 15
+
+_MODE_MAP = {
+    'agent_switch_mode_manual': 'MANUAL',
+    'agent_switch_mode_rr': 'AUTO_ROUND_ROBIN',
+    'agent_switch_mode_load': 'AUTO_LOAD_BASED',
+}
+
+_MODE_DESCRIPTIONS = {
+    'MANUAL': '🔧 Admin-selected\nEach request requires manual agent selection\nSafest option, full control',
+    'AUTO_ROUND_ROBIN': '🔄 Fair rotation\nSequentially rotates through active agents\nStateless, predictable distribution',
+    'AUTO_LOAD_BASED': '⚖️ Intelligent load distribution\nAssigns to agent with lowest workload\nResponsive, efficient',
+}
+
+# Load bars for 0..10 open requests
+_LOAD_BARS = tuple("█" * i + "░" * (10 - i) for i in range(11))
+
+# Static keyboards, built once at import
+_MAIN_MENU_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(
+            text="📊 View Current Mode",
+            callback_data="agent_view_mode"
+        ),
+        InlineKeyboardButton(
+            text="🔄 Change Mode",
+            callback_data="agent_change_mode"
+        )
+    ],
+    [
+        InlineKeyboardButton(
+            text="👥 View Agents",
+            callback_data="agent_list_agents"
+        ),
+        InlineKeyboardButton(
+            text="📈 View Load",
+            callback_data="agent_view_load"
+        )
+    ],
+    [
+        InlineKeyboardButton(
+            text="📋 View History",
+            callback_data="agent_view_history"
+        ),
+        InlineKeyboardButton(
+            text="⚠️ Emergency Reset",
+            callback_data="agent_emergency_reset"
+        )
+    ]
+])
+
+_CHANGE_MODE_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(
+        text="🔧 MANUAL (Admin-Selected)",
+        callback_data="agent_switch_mode_manual"
+    )],
+    [InlineKeyboardButton(
+        text="🔄 ROUND-ROBIN (Auto-Fair)",
+        callback_data="agent_switch_mode_rr"
+    )],
+    [InlineKeyboardButton(
+        text="⚖️ LOAD-BASED (Auto-Smart)",
+        callback_data="agent_switch_mode_load"
+    )],
+    [InlineKeyboardButton(
+        text="❌ Cancel",
+        callback_data="agent_cancel_change"
+    )]
+])
+
+_EMERGENCY_CONFIRM_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="✅ Confirm Reset", callback_data="agent_confirm_reset"),
+        InlineKeyboardButton(text="❌ Cancel", callback_data="agent_back_menu")
+    ]
+])
+
+_BACK_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Back", callback_data="agent_back_menu")]
+])
+
+
+async def render_agent_settings_menu(session: AsyncSession, language: str) -> str:
+    """Build the agent distribution settings menu text"""
     
-    async with session_maker() as session:
-        # Get current settings
-        current_mode = await get_agent_distribution_mode(session)
-        is_enabled = await is_agent_distribution_enabled(session)
-        
-        # Get active agents count
-        query = select(func.count(Agent.id)).where(Agent.is_active == True)
-        result = await session.execute(query)
-        active_agents_count = result.scalar() or 0
-        
-        # Build message
-        text = f"""⚙️ *{get_text('agent_settings', message.from_user.language_code or 'ar')}*
+    # Get current settings
+    current_mode, is_enabled = await get_agent_distribution_settings(session)
+    
+    # Get active agents count (capped, the badge only needs "N" or "N+")
+    active_agents = (
+        select(Agent.id)
+        .where(Agent.is_active == True)
+        .limit(ACTIVE_AGENTS_COUNT_CAP)
+        .subquery()
+    )
+    result = await session.execute(select(func.count()).select_from(active_agents))
+    active_agents_count = result.scalar_one()
+    active_agents_badge = f"{active_agents_count}{'+' if active_agents_count >= ACTIVE_AGENTS_COUNT_CAP else ''}"
+    
+    # Build message
+    return f"""⚙️ *{get_text('agent_settings', language)}*
 
 *Current Configuration:*
 🔄 *Distribution Mode:* `{current_mode}`
 🔌 *Feature Enabled:* {'✅ Yes' if is_enabled else '❌ No'}
-👥 *Active Agents:* `{active_agents_count}`
+👥 *Active Agents:* `{active_agents_badge}`
 
 *Available Modes:*
 • 🔧 `MANUAL` - Admin selects agent (Default - Safest)
@@ -54,120 +144,65 @@ async def agent_settings_menu(message: Message, session_maker):
 • ⚖️ `AUTO_LOAD_BASED` - Intelligent distribution (Requires feature flag)
 
 *What would you like to do?*"""
-        
-        # Build keyboard
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="📊 View Current Mode",
-                    callback_data="agent_view_mode"
-                ),
-                InlineKeyboardButton(
-                    text="🔄 Change Mode",
-                    callback_data="agent_change_mode"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="👥 View Agents",
-                    callback_data="agent_list_agents"
-                ),
-                InlineKeyboardButton(
-                    text="📈 View Load",
-                    callback_data="agent_view_load"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="📋 View History",
-                    callback_data="agent_view_history"
-                ),
-                InlineKeyboardButton(
-                    text="⚠️ Emergency Reset",
-                    callback_data="agent_emergency_reset"
-                )
-            ]
-        ])
-        
-        await message.answer(text, reply_markup=keyboard, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_view_mode")
+@router.message(Command('agent_settings'))
 @admin_required
-async def view_current_mode(query: CallbackQuery, session_maker):
+async def agent_settings_menu(message: Message, session: AsyncSession):
+    """Show agent distribution settings menu"""
+    
+    text = await render_agent_settings_menu(session, message.from_user.language_code or 'ar')
+    await message.answer(text, reply_markup=_MAIN_MENU_KB, parse_mode='Markdown')
+
+
+@admin_required
+async def view_current_mode(query: CallbackQuery, session: AsyncSession):
     """View current distribution mode details"""
     
-    async with session_maker() as session:
-        mode = await get_agent_distribution_mode(session)
-        is_enabled = await is_agent_distribution_enabled(session)
-        
-        mode_descriptions = {
-            'MANUAL': '🔧 Admin-selected\nEach request requires manual agent selection\nSafest option, full control',
-            'AUTO_ROUND_ROBIN': '🔄 Fair rotation\nSequentially rotates through active agents\nStateless, predictable distribution',
-            'AUTO_LOAD_BASED': '⚖️ Intelligent load distribution\nAssigns to agent with lowest workload\nResponsive, efficient',
-        }
-        
-        text = f"""*Current Agent Distribution Mode*
+    mode, is_enabled = await get_agent_distribution_settings(session)
+    
+    parts = [f"""*Current Agent Distribution Mode*
 
 📌 *Active Mode:* `{mode}`
 🔌 *Feature Enabled:* {'✅ Yes' if is_enabled else '❌ No'}
 
 *Description:*
-{mode_descriptions.get(mode, 'Unknown mode')}
+{_MODE_DESCRIPTIONS.get(mode, 'Unknown mode')}
 
 *Last 5 changes:*
-"""
-        
-        # Get recent mode changes
-        query = (
-            select(AuditLog)
-            .where(AuditLog.action == 'DISTRIBUTION_MODE_CHANGED')
-            .order_by(AuditLog.created_at.desc())
-            .limit(5)
+"""]
+    
+    # Get recent mode changes (only the rendered JSON fields, extracted in SQL)
+    changes_query = (
+        select(
+            AuditLog.created_at,
+            AuditLog.details['old_mode'].as_string(),
+            AuditLog.details['new_mode'].as_string(),
         )
-        result = await session.execute(query)
-        logs = result.scalars().all()
-        
-        if logs:
-            for log in logs:
-                old_mode = log.details.get('old_mode', 'N/A')
-                new_mode = log.details.get('new_mode', 'N/A')
-                timestamp = log.created_at.strftime('%Y-%m-%d %H:%M')
-                text += f"\n• {timestamp}: `{old_mode}` → `{new_mode}`"
-        else:
-            text += "\n• No changes recorded"
-        
-        await query.message.edit_text(text, parse_mode='Markdown')
+        .where(AuditLog.action == 'DISTRIBUTION_MODE_CHANGED')
+        .order_by(AuditLog.created_at.desc())
+        .limit(5)
+    )
+    result = await session.execute(changes_query)
+    logs = result.all()
+    
+    if logs:
+        for created_at, old_mode, new_mode in logs:
+            timestamp = created_at.isoformat(' ', 'minutes')[:16]
+            parts.append(f"\n• {timestamp}: `{old_mode or 'N/A'}` → `{new_mode or 'N/A'}`")
+    else:
+        parts.append("\n• No changes recorded")
+    
+    await query.message.edit_text("".join(parts), parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_change_mode")
 @admin_required
-async def change_mode_menu(query: CallbackQuery, session_maker):
+async def change_mode_menu(query: CallbackQuery, session: AsyncSession):
     """Show mode change options"""
     
-    async with session_maker() as session:
-        current_mode = await get_agent_distribution_mode(session)
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="🔧 MANUAL (Admin-Selected)",
-                callback_data="agent_switch_mode_manual"
-            )],
-            [InlineKeyboardButton(
-                text="🔄 ROUND-ROBIN (Auto-Fair)",
-                callback_data="agent_switch_mode_rr"
-            )],
-            [InlineKeyboardButton(
-                text="⚖️ LOAD-BASED (Auto-Smart)",
-                callback_data="agent_switch_mode_load"
-            )],
-            [InlineKeyboardButton(
-                text="❌ Cancel",
-                callback_data="agent_cancel_change"
-            )]
-        ])
-        
-        text = f"""*Switch Distribution Mode*
+    current_mode = await get_agent_distribution_mode(session)
+    
+    text = f"""*Switch Distribution Mode*
 
 *Current:* `{current_mode}`
 
@@ -175,54 +210,50 @@ async def change_mode_menu(query: CallbackQuery, session_maker):
 In-flight requests will continue using their assigned mode.
 
 *Select new mode:*"""
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+    
+    await query.message.edit_text(text, reply_markup=_CHANGE_MODE_KB, parse_mode='Markdown')
 
 
-@router.callback_query(F.data.startswith("agent_switch_mode_"))
 @admin_required
-async def execute_mode_switch(query: CallbackQuery, session_maker):
+async def execute_mode_switch(query: CallbackQuery, session: AsyncSession):
     """Execute mode switch"""
     
-    mode_map = {
-        'agent_switch_mode_manual': 'MANUAL',
-        'agent_switch_mode_rr': 'AUTO_ROUND_ROBIN',
-        'agent_switch_mode_load': 'AUTO_LOAD_BASED',
-    }
+    new_mode = _MODE_MAP.get(query.data, 'MANUAL')
     
-    new_mode = mode_map.get(query.data, 'MANUAL')
+    # Cheap short-circuit on the cached mode; the write below reports the real old mode
+    if await get_agent_distribution_mode(session) == new_mode:
+        await query.answer(f"Already using {new_mode} mode", show_alert=True)
+        return
     
-    async with session_maker() as session:
-        # Get old mode
-        old_mode = await get_agent_distribution_mode(session)
+    try:
+        # Update setting, reading the replaced mode under the same row lock
+        old_mode = await SystemSettingsService.swap_setting(
+            session,
+            key=SettingKey.AGENT_DISTRIBUTION_MODE,
+            value=new_mode,
+            category='agent_distribution',
+            admin_id=query.from_user.id,
+        ) or 'MANUAL'
         
         if old_mode == new_mode:
+            # Another admin switched to the same mode meanwhile; nothing was written
+            await session.rollback()
             await query.answer(f"Already using {new_mode} mode", show_alert=True)
             return
         
-        try:
-            # Update setting
-            await SystemSettingsService.set_setting(
-                session,
-                key=SettingKey.AGENT_DISTRIBUTION_MODE,
-                value=new_mode,
-                category='agent_distribution',
-                admin_id=query.from_user.id,
-            )
-            
-            # Log change
-            await AuditLogService.log_distribution_mode_change(
-                session,
-                admin_id=query.from_user.id,
-                old_mode=old_mode,
-                new_mode=new_mode,
-                change_reason="Admin initiated via Telegram",
-                ip_address=None,
-            )
-            
-            await session.commit()
-            
-            text = f"""✅ *Mode Switched Successfully*
+        # Log change
+        await AuditLogService.log_distribution_mode_change(
+            session,
+            admin_id=query.from_user.id,
+            old_mode=old_mode,
+            new_mode=new_mode,
+            change_reason="Admin initiated via Telegram",
+            ip_address=None,
+        )
+        
+        await session.commit()
+        
+        text = f"""✅ *Mode Switched Successfully*
 
 🔄 *Old Mode:* `{old_mode}`
 🔄 *New Mode:* `{new_mode}`
@@ -235,121 +266,149 @@ async def execute_mode_switch(query: CallbackQuery, session_maker):
 
 *Next Steps:*
 New financial requests will be assigned using `{new_mode}` strategy."""
-            
-            await query.message.edit_text(text, parse_mode='Markdown')
-            
-            # Notify other admins
-            await query.answer(f"Mode switched to {new_mode}", show_alert=True)
-            
-        except Exception as e:
-            error_text = f"❌ *Error switching mode*\n\n`{str(e)}`"
-            await query.message.edit_text(error_text, parse_mode='Markdown')
-            await query.answer("Error occurred", show_alert=True)
-
-
-@router.callback_query(F.data == "agent_list_agents")
-@admin_required
-async def list_agents(query: CallbackQuery, session_maker):
-    """List all agents with status"""
-    
-    async with session_maker() as session:
-        query_agents = select(Agent).order_by(Agent.name)
-        result = await session.execute(query_agents)
-        agents = result.scalars().all()
         
-        if not agents:
-            text = "❌ *No agents found*\n\nCreate an agent to enable agent distribution."
-        else:
-            text = f"""👥 *Active Agents* ({len(agents)})
+        await query.message.edit_text(text, parse_mode='Markdown')
+        
+        # Notify other admins
+        await query.answer(f"Mode switched to {new_mode}", show_alert=True)
+        
+    except Exception as e:
+        error_text = f"❌ *Error switching mode*\n\n`{str(e)}`"
+        await query.message.edit_text(error_text, parse_mode='Markdown')
+        await query.answer("Error occurred", show_alert=True)
 
-"""
-            for agent in agents:
-                status_icon = '🟢' if agent.status.value == 'active' else '🔴'
-                text += f"""{status_icon} *{agent.name}*
+
+def _render_agents_markdown(agents, total: int, page: int) -> str:
+    """Build the agents listing for one page"""
+    first = page * AGENTS_PER_PAGE + 1
+    parts = [f"""👥 *Active Agents* ({total}) — {first}-{first + len(agents) - 1}
+
+"""]
+    for agent in agents:
+        status_icon = '🟢' if agent.status.value == 'active' else '🔴'
+        parts.append(f"""{status_icon} *{agent.name}*
    Code: `{agent.agent_code}`
    Commission: {float(agent.commission_rate_deposit)*100:.1f}% / {float(agent.commission_rate_withdraw)*100:.1f}%
    Processed: ${float(agent.total_deposits_processed):.2f} / ${float(agent.total_withdrawals_processed):.2f}
    Earned: ${float(agent.total_commission_earned):.2f}
 
-"""
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="agent_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+""")
+    return "".join(parts)
+
+
+def _agents_page_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
+    """Prev/next buttons for the agents listing, plus Back"""
+    if total_pages <= 1:
+        return _BACK_KB
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"agent_list_agents_page_{page - 1}"))
+    nav.append(InlineKeyboardButton(text=f"{page + 1}/{total_pages}", callback_data="noop"))
+    if page < total_pages - 1:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"agent_list_agents_page_{page + 1}"))
+    return InlineKeyboardMarkup(inline_keyboard=[nav, *_BACK_KB.inline_keyboard])
+
+
+@admin_required
+async def list_agents(query: CallbackQuery, session: AsyncSession, page: int = 0):
+    """List all agents with status, one page at a time"""
+    
+    # Load exactly the columns this view renders, plus the total for the pager
+    query_agents = (
+        select(Agent, func.count().over())
+        .options(load_only(
+            Agent.name, Agent.agent_code, Agent.status,
+            Agent.commission_rate_deposit, Agent.commission_rate_withdraw,
+            Agent.total_deposits_processed, Agent.total_withdrawals_processed,
+            Agent.total_commission_earned
+        ))
+        .order_by(Agent.name, Agent.id)
+        .limit(AGENTS_PER_PAGE)
+        .offset(page * AGENTS_PER_PAGE)
+    )
+    result = await session.execute(query_agents)
+    rows = result.all()
+    
+    if not rows and page > 0:
+        # Agents were removed since the pager was drawn; start over
+        return await list_agents(query, session)
+    
+    if not rows:
+        text = "❌ *No agents found*\n\nCreate an agent to enable agent distribution."
+        keyboard = _BACK_KB
+    else:
+        total = rows[0][1]
+        text = _render_agents_markdown([agent for agent, _ in rows], total, page)
+        keyboard = _agents_page_keyboard(page, -(-total // AGENTS_PER_PAGE))
+    
+    await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_view_load")
 @admin_required
-async def view_agent_load(query: CallbackQuery, session_maker):
+async def view_agent_load(query: CallbackQuery, session: AsyncSession):
     """View current agent load distribution"""
     
-    async with session_maker() as session:
-        agents = await AgentDistributionService.get_active_agents(session)
-        
-        if not agents:
-            text = "❌ No active agents available"
-            await query.message.edit_text(text, parse_mode='Markdown')
-            return
-        
-        text = "📊 *Agent Load Distribution*\n\n"
-        
-        for agent in agents:
-            # Count pending requests
-            count_query = select(func.count(Outbox.id)).where(
-                (Outbox.assigned_agent_id == agent.id) &
-                (Outbox.status.in_([OutboxStatus.PENDING, OutboxStatus.PROCESSING]))
-            )
-            result = await session.execute(count_query)
-            pending_count = result.scalar() or 0
-            
-            load_bar = "█" * min(pending_count, 10) + "░" * max(0, 10 - pending_count)
-            text += f"""`{agent.agent_code}` {load_bar} {pending_count}
-"""
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="agent_back_menu")]
-        ])
+    agents = await AgentDistributionService.get_active_agents(session)
+    
+    if not agents:
+        text = "❌ No active agents available"
+        await query.message.edit_text(text, parse_mode='Markdown')
+        return
+    
+    # Count open requests for all agents in one grouped query
+    count_query = (
+        select(Outbox.assigned_agent_id, func.count(Outbox.id))
+        .where(Outbox.status.in_([OutboxStatus.PENDING, OutboxStatus.PROCESSING]))
+        .where(Outbox.assigned_agent_id.in_([agent.id for agent in agents]))
+        .group_by(Outbox.assigned_agent_id)
+    )
+    result = await session.execute(count_query)
+    pending_counts = dict(result.all())
+    
+    parts = ["📊 *Agent Load Distribution*\n\n"]
+    
+    for agent in agents:
+        pending_count = pending_counts.get(agent.id, 0)
         
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        load_bar = _LOAD_BARS[min(pending_count, 10)]
+        parts.append(f"`{agent.agent_code}` {load_bar} {pending_count}\n")
+    
+    text = "".join(parts)
+    
+    await query.message.edit_text(text, reply_markup=_BACK_KB, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_view_history")
 @admin_required
-async def view_assignment_history(query: CallbackQuery, session_maker):
+async def view_assignment_history(query: CallbackQuery, session: AsyncSession):
     """View recent agent assignments"""
     
-    async with session_maker() as session:
-        history_query = (
-            select(AuditLog)
-            .where(AuditLog.action.like('AGENT_ASSIGNED_%'))
-            .order_by(AuditLog.created_at.desc())
-            .limit(10)
+    history_query = (
+        select(
+            AuditLog.created_at,
+            AuditLog.details['strategy'].as_string(),
+            AuditLog.details['assigned_agent_id'].as_string(),
         )
-        result = await session.execute(history_query)
-        logs = result.scalars().all()
-        
-        if not logs:
-            text = "📋 No assignments recorded yet"
-        else:
-            text = "📋 *Recent Agent Assignments* (Last 10)\n\n"
-            for log in logs:
-                strategy = log.details.get('strategy', 'N/A')
-                agent_id = log.details.get('assigned_agent_id', 'N/A')
-                timestamp = log.created_at.strftime('%H:%M:%S')
-                text += f"• {timestamp} → Agent `{agent_id}` ({strategy})\n"
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="agent_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        .where(AuditLog.category == AuditCategory.AGENT_ASSIGNMENT)
+        .order_by(AuditLog.created_at.desc())
+        .limit(10)
+    )
+    result = await session.execute(history_query)
+    logs = result.all()
+    
+    if not logs:
+        text = "📋 No assignments recorded yet"
+    else:
+        parts = ["📋 *Recent Agent Assignments* (Last 10)\n\n"]
+        for created_at, strategy, agent_id in logs:
+            timestamp = created_at.isoformat(' ', 'seconds')[11:19]
+            parts.append(f"• {timestamp} → Agent `{agent_id or 'N/A'}` ({strategy or 'N/A'})\n")
+        text = "".join(parts)
+    
+    await query.message.edit_text(text, reply_markup=_BACK_KB, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_emergency_reset")
 @admin_required
-async def emergency_reset_menu(query: CallbackQuery, session_maker):
+async def emergency_reset_menu(query: CallbackQuery, session: AsyncSession):
     """Emergency reset confirmation"""
     
     text = """⚠️ *Emergency Reset - Confirm Action*
@@ -364,53 +423,86 @@ Only use if system behaves unexpectedly.
 
 *Are you sure?*"""
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="✅ Confirm Reset", callback_data="agent_confirm_reset"),
-            InlineKeyboardButton(text="❌ Cancel", callback_data="agent_back_menu")
-        ]
-    ])
-    
-    await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+    await query.message.edit_text(text, reply_markup=_EMERGENCY_CONFIRM_KB, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "agent_confirm_reset")
 @admin_required
-async def execute_emergency_reset(query: CallbackQuery, session_maker):
+async def execute_emergency_reset(query: CallbackQuery, session: AsyncSession):
     """Execute emergency reset"""
     
-    async with session_maker() as session:
-        old_mode = await get_agent_distribution_mode(session)
-        
-        await SystemSettingsService.set_setting(
-            session,
-            key=SettingKey.AGENT_DISTRIBUTION_MODE,
-            value='MANUAL',
-            admin_id=query.from_user.id,
-        )
-        
-        await AuditLogService.log_distribution_mode_change(
-            session,
-            admin_id=query.from_user.id,
-            old_mode=old_mode,
-            new_mode='MANUAL',
-            change_reason="Emergency reset initiated by admin",
-            ip_address=None,
-        )
-        
-        await session.commit()
-        
-        text = f"""✅ *Emergency Reset Complete*
+    # Read the stored mode, not the cached one: a stale cache must never skip a reset
+    old_mode = await SystemSettingsService.get_setting(
+        session,
+        SettingKey.AGENT_DISTRIBUTION_MODE,
+        default='MANUAL',
+        use_cache=False
+    )
+    
+    if old_mode == 'MANUAL':
+        # Drop a stale cached mode so the menu stops showing it
+        SystemSettingsService.invalidate_cache(SettingKey.AGENT_DISTRIBUTION_MODE)
+        text = "✅ *Already in MANUAL mode*\n\nNo reset needed, nothing was changed."
+        await query.message.edit_text(text, reply_markup=_BACK_KB, parse_mode='Markdown')
+        return
+    
+    await SystemSettingsService.set_setting(
+        session,
+        key=SettingKey.AGENT_DISTRIBUTION_MODE,
+        value='MANUAL',
+        admin_id=query.from_user.id,
+    )
+    
+    await AuditLogService.log_distribution_mode_change(
+        session,
+        admin_id=query.from_user.id,
+        old_mode=old_mode,
+        new_mode='MANUAL',
+        change_reason="Emergency reset initiated by admin",
+        ip_address=None,
+    )
+    
+    await session.commit()
+    
+    text = f"""✅ *Emergency Reset Complete*
 
 🔄 Mode reset to `MANUAL`
 ⏰ All new requests will require manual agent assignment
 
 System is now in safe mode."""
-        
-        await query.message.edit_text(text, parse_mode='Markdown')
+    
+    await query.message.edit_text(text, parse_mode='Markdown')
 
 
-@router.callback_query(F.data.in_(["agent_back_menu", "agent_cancel_change"]))
-async def back_to_menu(query: CallbackQuery):
-    """Go back to main menu"""
-    await agent_settings_menu(query.message, query.message.bot.session)
+@admin_required
+async def back_to_menu(query: CallbackQuery, session: AsyncSession):
+    """Go back to main menu, reusing the injected session"""
+    text = await render_agent_settings_menu(session, query.from_user.language_code or 'ar')
+    await query.message.edit_text(text, reply_markup=_MAIN_MENU_KB, parse_mode='Markdown')
+
+
+# Static callback_data -> handler, routed by one filter instead of one per handler
+_CALLBACK_HANDLERS = {
+    "agent_view_mode": view_current_mode,
+    "agent_change_mode": change_mode_menu,
+    **dict.fromkeys(_MODE_MAP, execute_mode_switch),
+    "agent_list_agents": list_agents,
+    "agent_view_load": view_agent_load,
+    "agent_view_history": view_assignment_history,
+    "agent_emergency_reset": emergency_reset_menu,
+    "agent_confirm_reset": execute_emergency_reset,
+    "agent_back_menu": back_to_menu,
+    "agent_cancel_change": back_to_menu,
+}
+
+
+@router.callback_query(F.data.startswith("agent_list_agents_page_"))
+async def list_agents_page(query: CallbackQuery, session: AsyncSession):
+    """Show another page of the agents listing"""
+    page = query.data.removeprefix("agent_list_agents_page_")
+    await list_agents(query, session, int(page) if page.isdigit() else 0)
+
+
+@router.callback_query(F.data.in_(frozenset(_CALLBACK_HANDLERS)))
+async def dispatch_agent_callback(query: CallbackQuery, session: AsyncSession):
+    """Route agent settings callbacks with a single dict lookup"""
+    await _CALLBACK_HANDLERS[query.data](query, session)
@@ -9,6 +9,8 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, C
 from aiogram.filters import Command
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from functools import lru_cache
+import re
 
 from models import GameSession, GameRound, AuditLog
 from services.system_settings_service import (
@@ -20,81 +22,130 @@ from services.system_settings_service import (
 )
 from services.audit_log_service import AuditLogService
 from utils.auth import admin_required
+from utils.callback_dedup import CallbackDedupMiddleware
 from services.i18n import get_text
 
 router = Router()
-
-
-@router.message(Command('algorithm_settings'))
-@admin_required
-async def algorithm_settings_menu(message: Message, session_maker):
-    """Show game algorithm settings menu"""
-    
-    async with session_maker() as session:
-        # Get current settings
-        current_algo = await get_game_algorithm_mode(session)
-        house_edge = await get_house_edge_percentage(session)
-        is_enabled = await is_game_algorithms_enabled(session)
-        
-        # Get active game sessions count
-        query = select(func.count(GameSession.id)).where(GameSession.status == 'ACTIVE')
-        result = await session.execute(query)
-        active_sessions = result.scalar() or 0
-        
-        text = f"""⚙️ *{get_text('algorithm_settings', message.from_user.language_code or 'ar')}*
+router.callback_query.middleware(CallbackDedupMiddleware())
+
+# Texts are MarkdownV2: static templates below are escaped by hand, dynamic
+# values go through _mv2 (plain text) or _mv2_code (inside `code` spans)
+_MV2_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+
+@lru_cache(maxsize=256)
+def _mv2(value: str) -> str:
+    """Escape a value for MarkdownV2 plain text"""
+    return _MV2_SPECIAL.sub(r'\\\1', value)
+
+
+def _mv2_code(value) -> str:
+    """Escape a value for a MarkdownV2 `code` span"""
+    return str(value).replace('\\', '\\\\').replace('`', '\\`')
+
+
+# (fixed sessions, dynamic sessions, fixed wins, fixed rounds) for view_algorithm_stats
+_ALGORITHM_STATS_STMT = select(
+    func.count().filter(GameSession.algorithm_used == 'FIXED_HOUSE_EDGE'),
+    func.count().filter(GameSession.algorithm_used == 'DYNAMIC'),
+    select(func.count())
+    .select_from(GameRound)
+    .where(GameRound.algorithm_used == 'FIXED_HOUSE_EDGE', GameRound.result == 'WIN')
+    .scalar_subquery(),
+    select(func.count())
+    .select_from(GameRound)
+    .where(GameRound.algorithm_used == 'FIXED_HOUSE_EDGE')
+    .scalar_subquery(),
+).select_from(GameSession)
+
+# Static keyboards and texts, built once at import
+_MAIN_MENU_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="📊 View Settings", callback_data="algo_view_settings"),
+        InlineKeyboardButton(text="🔄 Change Algorithm", callback_data="algo_change_mode")
+    ],
+    [
+        InlineKeyboardButton(text="📈 Adjust House Edge", callback_data="algo_adjust_edge"),
+        InlineKeyboardButton(text="📋 View History", callback_data="algo_view_history")
+    ],
+    [
+        InlineKeyboardButton(text="📊 Algorithm Stats", callback_data="algo_view_stats"),
+        InlineKeyboardButton(text="⚠️ Emergency Reset", callback_data="algo_emergency_reset")
+    ]
+])
+
+_CHANGE_MODE_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(
+        text="💎 FIXED_HOUSE_EDGE (Conservative)",
+        callback_data="algo_switch_fixed"
+    )],
+    [InlineKeyboardButton(
+        text="🧠 DYNAMIC (Experimental)",
+        callback_data="algo_switch_dynamic"
+    )],
+    [InlineKeyboardButton(
+        text="❌ Cancel",
+        callback_data="algo_cancel_change"
+    )]
+])
+
+_ADJUST_EDGE_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="2.5%", callback_data="algo_edge_2.5")],
+    [InlineKeyboardButton(text="3.5%", callback_data="algo_edge_3.5")],
+    [InlineKeyboardButton(text="5.0%", callback_data="algo_edge_5.0")],
+    [InlineKeyboardButton(text="7.0%", callback_data="algo_edge_7.0")],
+    [InlineKeyboardButton(text="❌ Cancel", callback_data="algo_back_menu")]
+])
+
+_EMERGENCY_CONFIRM_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="✅ Confirm Reset", callback_data="algo_confirm_reset"),
+        InlineKeyboardButton(text="❌ Cancel", callback_data="algo_back_menu")
+    ]
+])
+
+_BACK_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Back", callback_data="algo_back_menu")]
+])
+
+_MAIN_MENU_TEXT = r"""⚙️ *{title}*
 
 *Current Configuration:*
-🎮 *Algorithm Mode:* `{current_algo}`
+🎮 *Algorithm Mode:* `{algo}`
 📊 *House Edge:* `{house_edge}%`
-🔌 *Feature Enabled:* {'✅ Yes' if is_enabled else '❌ No'}
+🔌 *Feature Enabled:* {enabled}
 🎲 *Active Sessions:* `{active_sessions}`
 
 *Available Algorithms:*
-• 💎 `FIXED_HOUSE_EDGE` - Transparent, conservative (Default)
-• 🧠 `DYNAMIC` - Adaptive behavior (Beta)
+• 💎 `FIXED_HOUSE_EDGE` \- Transparent, conservative \(Default\)
+• 🧠 `DYNAMIC` \- Adaptive behavior \(Beta\)
 
 *What would you like to do?*"""
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="📊 View Settings", callback_data="algo_view_settings"),
-                InlineKeyboardButton(text="🔄 Change Algorithm", callback_data="algo_change_mode")
-            ],
-            [
-                InlineKeyboardButton(text="📈 Adjust House Edge", callback_data="algo_adjust_edge"),
-                InlineKeyboardButton(text="📋 View History", callback_data="algo_view_history")
-            ],
-            [
-                InlineKeyboardButton(text="📊 Algorithm Stats", callback_data="algo_view_stats"),
-                InlineKeyboardButton(text="⚠️ Emergency Reset", callback_data="algo_emergency_reset")
-            ]
-        ])
-        
-        await message.answer(text, reply_markup=keyboard, parse_mode='Markdown')
 
+_EMERGENCY_TEXT = r"""⚠️ *Emergency Reset \- Confirm Action*
 
-@router.callback_query(F.data == "algo_view_settings")
-@admin_required
-async def view_algorithm_settings(query: CallbackQuery, session_maker):
-    """View current algorithm settings in detail"""
-    
-    async with session_maker() as session:
-        current_algo = await get_game_algorithm_mode(session)
-        house_edge = await get_house_edge_percentage(session)
-        max_payout = await SystemSettingsService.get_setting(session, SettingKey.MAX_PAYOUT_MULTIPLIER, default=36.0)
-        rtp = await SystemSettingsService.get_setting(session, SettingKey.RTP_TARGET, default=95.0)
-        
-        algo_descriptions = {
-            'FIXED_HOUSE_EDGE': '💎 Fixed, transparent house advantage\nDeterministic outcomes\nMathematically verifiable fairness\n\n✓ Default mode\n✓ Most conservative\n✓ Full transparency',
-            'DYNAMIC': '🧠 Adaptive algorithm\nBased on player behavior and risk factors\nIsolated, sandboxed implementation\n\n⚠️ Experimental mode\n⚠️ Only affects NEW sessions',
-        }
-        
-        text = f"""*Algorithm Configuration*
+This will reset algorithm mode to FIXED\_HOUSE\_EDGE \(safest default\)\.
+
+*This does NOT affect:*
+✓ Existing game sessions
+✓ Past outcomes \(immutable\)
+✓ Commission records
+
+*Only use if system behaves unexpectedly\.*
+
+*Are you sure?*"""
+
+_ALGO_DESCRIPTIONS = {
+    'FIXED_HOUSE_EDGE': '💎 Fixed, transparent house advantage\nDeterministic outcomes\nMathematically verifiable fairness\n\n✓ Default mode\n✓ Most conservative\n✓ Full transparency',
+    'DYNAMIC': '🧠 Adaptive algorithm\nBased on player behavior and risk factors\nIsolated, sandboxed implementation\n\n⚠️ Experimental mode\n⚠️ Only affects NEW sessions',
+}
+
+_ALGO_SETTINGS_TEMPLATE = """*Algorithm Configuration*
 
-🎮 *Active Algorithm:* `{current_algo}`
+🎮 *Active Algorithm:* `{algo}`
 
 *Details:*
-{algo_descriptions.get(current_algo, 'Unknown algorithm')}
+{desc}
 
 *Current Parameters:*
 📊 House Edge: `{house_edge}%`
@@ -106,12 +157,71 @@ async def view_algorithm_settings(query: CallbackQuery, session_maker):
 ✓ Active sessions unchanged
 ✓ All outcomes logged immutably
 ✓ Fully auditable"""
+
+_CHANGE_MODE_TEXT = """*Switch Algorithm Mode*
+
+*Current:* `{algo}`
+
+⚠️ *Important:*
+✓ Only affects NEW game sessions
+✓ Active sessions continue unaffected
+✓ All changes logged to audit trail
+
+*Select new algorithm:*"""
+
+
+async def render_algorithm_settings_menu(session: AsyncSession, language: str) -> str:
+    """Build the game algorithm settings menu text"""
+    
+    # Get current settings
+    current_algo = await get_game_algorithm_mode(session)
+    house_edge = await get_house_edge_percentage(session)
+    is_enabled = await is_game_algorithms_enabled(session)
+    
+    # Get active game sessions count
+    query = select(func.count(GameSession.id)).where(GameSession.status == 'ACTIVE')
+    result = await session.execute(query)
+    active_sessions = result.scalar() or 0
+    
+    return _MAIN_MENU_TEXT.format(
+        title=_mv2(get_text('algorithm_settings', language)),
+        algo=current_algo,
+        house_edge=house_edge,
+        enabled='✅ Yes' if is_enabled else '❌ No',
+        active_sessions=active_sessions,
+    )
+
+
+@router.message(Command('algorithm_settings'))
+@admin_required
+async def algorithm_settings_menu(message: Message, session_maker):
+    """Show game algorithm settings menu"""
+    
+    async with session_maker() as session:
+        text = await render_algorithm_settings_menu(session, message.from_user.language_code or 'ar')
+        await message.answer(text, reply_markup=_MAIN_MENU_KB, parse_mode='MarkdownV2')
+
+
+@router.callback_query(F.data == "algo_view_settings")
+@admin_required
+async def view_algorithm_settings(query: CallbackQuery, session_maker):
+    """View current algorithm settings in detail"""
+    
+    async with session_maker() as session:
+        current_algo = await get_game_algorithm_mode(session)
+        house_edge = await get_house_edge_percentage(session)
+        max_payout = await SystemSettingsService.get_setting(session, SettingKey.MAX_PAYOUT_MULTIPLIER, default=36.0)
+        rtp = await SystemSettingsService.get_setting(session, SettingKey.RTP_TARGET, default=95.0)
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="algo_back_menu")]
-        ])
+        text = _ALGO_SETTINGS_TEMPLATE.format(
+            algo=current_algo,
+            desc=_ALGO_DESCRIPTIONS.get(current_algo, 'Unknown algorithm'),
+            house_edge=house_edge,
+            max_payout=max_payout,
+            rtp=rtp,
+        )
         
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.message.edit_text(text, reply_markup=_BACK_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data == "algo_change_mode")
@@ -122,33 +232,9 @@ async def change_algorithm_mode(query: CallbackQuery, session_maker):
     async with session_maker() as session:
         current_algo = await get_game_algorithm_mode(session)
         
-        text = f"""*Switch Algorithm Mode*
-
-*Current:* `{current_algo}`
-
-⚠️ *Important:*
-✓ Only affects NEW game sessions
-✓ Active sessions continue unaffected
-✓ All changes logged to audit trail
-
-*Select new algorithm:*"""
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="💎 FIXED_HOUSE_EDGE (Conservative)",
-                callback_data="algo_switch_fixed"
-            )],
-            [InlineKeyboardButton(
-                text="🧠 DYNAMIC (Experimental)",
-                callback_data="algo_switch_dynamic"
-            )],
-            [InlineKeyboardButton(
-                text="❌ Cancel",
-                callback_data="algo_cancel_change"
-            )]
-        ])
+        text = _CHANGE_MODE_TEXT.format(algo=current_algo)
         
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.message.edit_text(text, reply_markup=_CHANGE_MODE_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data.startswith("algo_switch_"))
@@ -164,25 +250,31 @@ async def execute_algorithm_switch(query: CallbackQuery, session_maker):
     new_algo = mode_map.get(query.data, 'FIXED_HOUSE_EDGE')
     
     async with session_maker() as session:
-        old_algo = await get_game_algorithm_mode(session)
+        # Cheap short-circuit on the cached mode; the write below reports the real old mode
+        if await get_game_algorithm_mode(session) == new_algo:
+            await query.answer(f"Already using {new_algo}", show_alert=True)
+            return
+        
         old_config = {
             'house_edge': float(await get_house_edge_percentage(session)),
             'max_payout': float(await SystemSettingsService.get_setting(session, SettingKey.MAX_PAYOUT_MULTIPLIER, default=36.0)),
         }
         
-        if old_algo == new_algo:
-            await query.answer(f"Already using {new_algo}", show_alert=True)
-            return
-        
         try:
-            # Update setting
-            await SystemSettingsService.set_setting(
+            # Update setting, reading the replaced mode under the same row lock
+            old_algo = await SystemSettingsService.swap_setting(
                 session,
                 key=SettingKey.GAME_ALGORITHM_MODE,
                 value=new_algo,
                 category='game_algorithms',
                 admin_id=query.from_user.id,
-            )
+            ) or 'FIXED_HOUSE_EDGE'
+            
+            if old_algo == new_algo:
+                # Another admin switched to the same mode meanwhile; nothing was written
+                await session.rollback()
+                await query.answer(f"Already using {new_algo}", show_alert=True)
+                return
             
             # Log change
             new_config = old_config.copy()
@@ -199,9 +291,9 @@ async def execute_algorithm_switch(query: CallbackQuery, session_maker):
             
             await session.commit()
             
-            text = f"""✅ *Algorithm Switched Successfully*
+            text = rf"""✅ *Algorithm Switched Successfully*
 
-🎮 *Old Algorithm:* `{old_algo}`
+🎮 *Old Algorithm:* `{_mv2_code(old_algo)}`
 🎮 *New Algorithm:* `{new_algo}`
 ⏰ *Time:* `{query.message.date.strftime('%Y-%m-%d %H:%M:%S')}`
 
@@ -212,14 +304,15 @@ async def execute_algorithm_switch(query: CallbackQuery, session_maker):
 ✓ Change logged to audit trail
 
 *Safety:*
-All game outcomes using `{new_algo}` will be fully auditable."""
+All game outcomes using `{new_algo}` will be fully auditable\."""
             
-            await query.message.edit_text(text, parse_mode='Markdown')
+            await query.message.edit_text(text, parse_mode='MarkdownV2')
             await query.answer(f"Algorithm switched to {new_algo}", show_alert=True)
             
         except Exception as e:
-            error_text = f"❌ *Error switching algorithm*\n\n`{str(e)}`"
-            await query.message.edit_text(error_text, parse_mode='Markdown')
+            await session.rollback()
+            error_text = f"❌ *Error switching algorithm*\n\n`{_mv2_code(e)}`"
+            await query.message.edit_text(error_text, parse_mode='MarkdownV2')
             await query.answer("Error occurred", show_alert=True)
 
 
@@ -231,29 +324,21 @@ async def adjust_house_edge(query: CallbackQuery, session_maker):
     async with session_maker() as session:
         current_edge = await get_house_edge_percentage(session)
         
-        text = f"""*Adjust House Edge*
+        text = rf"""*Adjust House Edge*
 
 *Current:* `{current_edge}%`
 
 ⚠️ *Warning:*
 House edge directly affects:
-- Player win probability
-- House profit margin
-- RTP (Return To Player)
+\- Player win probability
+\- House profit margin
+\- RTP \(Return To Player\)
 
-Standard range: 2.5% - 7.5%
+Standard range: 2\.5% \- 7\.5%
 
-*Select new value:* (or type custom)"""
+*Select new value:* \(or type custom\)"""
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="2.5%", callback_data="algo_edge_2.5")],
-            [InlineKeyboardButton(text="3.5%", callback_data="algo_edge_3.5")],
-            [InlineKeyboardButton(text="5.0%", callback_data="algo_edge_5.0")],
-            [InlineKeyboardButton(text="7.0%", callback_data="algo_edge_7.0")],
-            [InlineKeyboardButton(text="❌ Cancel", callback_data="algo_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.message.edit_text(text, reply_markup=_ADJUST_EDGE_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data.startswith("algo_edge_"))
@@ -265,22 +350,27 @@ async def set_house_edge(query: CallbackQuery, session_maker):
     
     async with session_maker() as session:
         try:
-            old_edge = await get_house_edge_percentage(session)
-            
             # Validate range
             edge_value = float(new_edge)
             if not (0.1 <= edge_value <= 50.0):
                 await query.answer("House edge must be between 0.1% and 50%", show_alert=True)
                 return
             
-            # Update setting
-            await SystemSettingsService.set_setting(
+            # Update setting, reading the replaced edge under the same row lock
+            old_edge = await SystemSettingsService.swap_setting(
                 session,
                 key=SettingKey.HOUSE_EDGE_PERCENTAGE,
                 value=str(edge_value),
                 category='game_algorithms',
                 admin_id=query.from_user.id,
             )
+            old_edge = float(old_edge) if old_edge is not None else 5.0
+            
+            if old_edge == edge_value:
+                # Unchanged (possibly set by another admin meanwhile); write and log nothing
+                await session.rollback()
+                await query.answer(f"House edge is already {edge_value}%", show_alert=True)
+                return
             
             # Log change
             await AuditLogService.log_algorithm_config_change(
@@ -296,7 +386,7 @@ async def set_house_edge(query: CallbackQuery, session_maker):
             
             await session.commit()
             
-            text = f"""✅ *House Edge Updated*
+            text = rf"""✅ *House Edge Updated*
 
 📊 *Old Edge:* `{old_edge}%`
 📊 *New Edge:* `{edge_value}%`
@@ -306,12 +396,13 @@ async def set_house_edge(query: CallbackQuery, session_maker):
 📈 House Profit: `{edge_value}%` per round
 
 *Effect:*
-Affects all NEW game sessions.
-Active sessions unchanged."""
+Affects all NEW game sessions\.
+Active sessions unchanged\."""
             
-            await query.message.edit_text(text, parse_mode='Markdown')
+            await query.message.edit_text(text, parse_mode='MarkdownV2')
             
         except Exception as e:
+            await session.rollback()
             await query.answer(f"Error: {str(e)}", show_alert=True)
 
 
@@ -322,29 +413,27 @@ async def view_algo_change_history(query: CallbackQuery, session_maker):
     
     async with session_maker() as session:
         history_query = (
-            select(AuditLog)
+            select(
+                AuditLog.created_at,
+                AuditLog.details['old_algorithm'].as_string(),
+                AuditLog.details['new_algorithm'].as_string(),
+            )
             .where(AuditLog.action == 'ALGORITHM_CONFIG_CHANGED')
             .order_by(AuditLog.created_at.desc())
             .limit(10)
         )
         result = await session.execute(history_query)
-        logs = result.scalars().all()
+        logs = result.all()
         
         if not logs:
-            text = "📋 No algorithm changes recorded yet"
+            parts = ["📋 No algorithm changes recorded yet"]
         else:
-            text = "📋 *Algorithm Change History* (Last 10)\n\n"
-            for log in logs:
-                old = log.details.get('old_algorithm', 'N/A')
-                new = log.details.get('new_algorithm', 'N/A')
-                timestamp = log.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                text += f"• {timestamp}: `{old}` → `{new}`\n"
+            parts = ["📋 *Algorithm Change History* \\(Last 10\\)\n\n"]
+            for created_at, old, new in logs:
+                timestamp = created_at.strftime('%Y-%m-%d %H:%M:%S')
+                parts.append(f"• {_mv2(timestamp)}: `{_mv2_code(old or 'N/A')}` → `{_mv2_code(new or 'N/A')}`\n")
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="algo_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.message.edit_text("".join(parts), reply_markup=_BACK_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data == "algo_view_stats")
@@ -353,32 +442,15 @@ async def view_algorithm_stats(query: CallbackQuery, session_maker):
     """View algorithm performance statistics"""
     
     async with session_maker() as session:
-        # Count sessions by algorithm
-        query_fixed = select(func.count(GameSession.id)).where(GameSession.algorithm_used == 'FIXED_HOUSE_EDGE')
-        result = await session.execute(query_fixed)
-        count_fixed = result.scalar() or 0
-        
-        query_dynamic = select(func.count(GameSession.id)).where(GameSession.algorithm_used == 'DYNAMIC')
-        result = await session.execute(query_dynamic)
-        count_dynamic = result.scalar() or 0
-        
-        # Win rates
-        from sqlalchemy import and_
-        query_wins = select(func.count(GameRound.id)).where(
-            and_(GameRound.result == 'WIN', GameRound.algorithm_used == 'FIXED_HOUSE_EDGE')
-        )
-        result = await session.execute(query_wins)
-        wins_fixed = result.scalar() or 0
+        # Session and round counts in one round-trip
+        result = await session.execute(_ALGORITHM_STATS_STMT)
+        count_fixed, count_dynamic, wins_fixed, total_fixed = result.one()
         
-        query_total = select(func.count(GameRound.id)).where(GameRound.algorithm_used == 'FIXED_HOUSE_EDGE')
-        result = await session.execute(query_total)
-        total_fixed = result.scalar() or 1  # Avoid division by zero
+        win_rate_fixed = (wins_fixed / total_fixed * 100) if total_fixed else 0
         
-        win_rate_fixed = (wins_fixed / total_fixed * 100) if total_fixed > 0 else 0
-        
-        text = f"""📊 *Algorithm Performance Statistics*
+        text = rf"""📊 *Algorithm Performance Statistics*
 
-💎 *FIXED_HOUSE_EDGE*
+💎 *FIXED\_HOUSE\_EDGE*
    Sessions: `{count_fixed}`
    Win Rate: `{win_rate_fixed:.1f}%`
    Status: Active
@@ -388,14 +460,10 @@ async def view_algorithm_stats(query: CallbackQuery, session_maker):
    Status: {'Active' if count_dynamic > 0 else 'Inactive'}
 
 ⚠️ Note:
-Statistics are for monitoring only.
-All outcomes are immutable and auditable."""
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="algo_back_menu")]
-        ])
+Statistics are for monitoring only\.
+All outcomes are immutable and auditable\."""
         
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.message.edit_text(text, reply_markup=_BACK_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data == "algo_emergency_reset")
@@ -403,27 +471,7 @@ All outcomes are immutable and auditable."""
 async def algo_emergency_reset(query: CallbackQuery):
     """Emergency reset confirmation"""
     
-    text = """⚠️ *Emergency Reset - Confirm Action*
-
-This will reset algorithm mode to FIXED_HOUSE_EDGE (safest default).
-
-*This does NOT affect:*
-✓ Existing game sessions
-✓ Past outcomes (immutable)
-✓ Commission records
-
-*Only use if system behaves unexpectedly.*
-
-*Are you sure?*"""
-    
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="✅ Confirm Reset", callback_data="algo_confirm_reset"),
-            InlineKeyboardButton(text="❌ Cancel", callback_data="algo_back_menu")
-        ]
-    ])
-    
-    await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+    await query.message.edit_text(_EMERGENCY_TEXT, reply_markup=_EMERGENCY_CONFIRM_KB, parse_mode='MarkdownV2')
 
 
 @router.callback_query(F.data == "algo_confirm_reset")
@@ -432,37 +480,50 @@ async def execute_algo_emergency_reset(query: CallbackQuery, session_maker):
     """Execute emergency reset"""
     
     async with session_maker() as session:
-        old_algo = await get_game_algorithm_mode(session)
-        
-        await SystemSettingsService.set_setting(
-            session,
-            key=SettingKey.GAME_ALGORITHM_MODE,
-            value='FIXED_HOUSE_EDGE',
-            admin_id=query.from_user.id,
-        )
-        
-        await AuditLogService.log_algorithm_config_change(
-            session,
-            admin_id=query.from_user.id,
-            old_algorithm=old_algo,
-            new_algorithm='FIXED_HOUSE_EDGE',
-            change_reason="Emergency reset initiated by admin",
-            ip_address=None,
-        )
-        
-        await session.commit()
-        
-        text = """✅ *Emergency Reset Complete*
+        try:
+            old_algo = await SystemSettingsService.swap_setting(
+                session,
+                key=SettingKey.GAME_ALGORITHM_MODE,
+                value='FIXED_HOUSE_EDGE',
+                admin_id=query.from_user.id,
+            ) or 'FIXED_HOUSE_EDGE'
+            
+            if old_algo == 'FIXED_HOUSE_EDGE':
+                # Already in safe mode; write and log nothing
+                await session.rollback()
+                await query.answer("Already in FIXED_HOUSE_EDGE, nothing was changed", show_alert=True)
+                return
+            
+            await AuditLogService.log_algorithm_config_change(
+                session,
+                admin_id=query.from_user.id,
+                old_algorithm=old_algo,
+                new_algorithm='FIXED_HOUSE_EDGE',
+                change_reason="Emergency reset initiated by admin",
+                ip_address=None,
+            )
+            
+            await session.commit()
+            
+            text = r"""✅ *Emergency Reset Complete*
 
 🎮 Algorithm reset to `FIXED_HOUSE_EDGE`
 ⏰ All new games will use conservative, transparent algorithm
 
-System is now in safe mode."""
-        
-        await query.message.edit_text(text, parse_mode='Markdown')
+System is now in safe mode\."""
+            
+            await query.message.edit_text(text, parse_mode='MarkdownV2')
+            
+        except Exception as e:
+            await session.rollback()
+            await query.answer(f"Error: {str(e)}", show_alert=True)
 
 
 @router.callback_query(F.data.in_(["algo_back_menu", "algo_cancel_change"]))
-async def algo_back_to_menu(query: CallbackQuery):
-    """Go back to main menu"""
-    await algorithm_settings_menu(query.message, query.message.bot.session)
+@admin_required
+async def algo_back_to_menu(query: CallbackQuery, session_maker):
+    """Go back to main menu, editing the current message in place"""
+    
+    async with session_maker() as session:
+        text = await render_algorithm_settings_menu(session, query.from_user.language_code or 'ar')
+        await query.message.edit_text(text, reply_markup=_MAIN_MENU_KB, parse_mode='MarkdownV2')
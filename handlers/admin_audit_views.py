@@ -8,17 +8,108 @@ from aiogram import Router, F
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Document, FSInputFile
 from aiogram.filters import Command
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from datetime import datetime, timedelta
+from sqlalchemy import select, func, desc, tuple_, bindparam
+from datetime import datetime, timedelta, timezone
+import asyncio
 import json
 import csv
 import io
 
 from models import AuditLog, GameSession, GameRound, Outbox
+
+# orjson is optional (see requirements.txt); details are exported as JSON text either way
+try:
+    import orjson
+
+    def json_dumps(data) -> str:
+        return orjson.dumps(data).decode('utf-8')
+except ImportError:
+    json_dumps = json.dumps
 from utils.auth import admin_required
+from utils.keyset import encode_cursor, decode_cursor
+from utils.callback_dedup import CallbackDedupMiddleware
 from services.i18n import get_text
 
 router = Router()
+router.callback_query.middleware(CallbackDedupMiddleware())
+
+GAME_EVENT_ACTIONS = ('GAME_STARTED', 'GAME_COMPLETED')
+
+# CSV export: newest rows exported, and rows fetched per round-trip while streaming
+EXPORT_MAX_ROWS = 1000
+EXPORT_BATCH_SIZE = 200
+
+# Rows per page of the recent-logs and algorithm-changes views
+RECENT_LOGS_PER_PAGE = 20
+ALGO_CHANGES_PER_PAGE = 15
+
+# Keyset pages, newest first: the first page, then rows older than the cursor
+_LOG_KEY = tuple_(AuditLog.created_at, AuditLog.id)
+_LOG_CURSOR = tuple_(
+    bindparam("cursor_ts", type_=AuditLog.created_at.type),
+    bindparam("cursor_id", type_=AuditLog.id.type)
+)
+
+_RECENT_LOGS_STMT = (
+    select(AuditLog.created_at, AuditLog.action, AuditLog.admin_id, AuditLog.id)
+    .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+    .limit(RECENT_LOGS_PER_PAGE + 1)
+)
+_RECENT_LOGS_OLDER_STMT = _RECENT_LOGS_STMT.where(_LOG_KEY < _LOG_CURSOR)
+
+_ALGO_CHANGES_STMT = (
+    select(
+        AuditLog.created_at,
+        AuditLog.admin_id,
+        AuditLog.details['old_algorithm'].as_string(),
+        AuditLog.details['new_algorithm'].as_string(),
+        AuditLog.id,
+    )
+    .where(AuditLog.action == 'ALGORITHM_CONFIG_CHANGED')
+    .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+    .limit(ALGO_CHANGES_PER_PAGE + 1)
+)
+_ALGO_CHANGES_OLDER_STMT = _ALGO_CHANGES_STMT.where(_LOG_KEY < _LOG_CURSOR)
+
+# (total, algorithm changes, game events) for the dashboard
+_AUDIT_COUNTS_STMT = select(
+    func.count(),
+    func.count().filter(AuditLog.action == 'ALGORITHM_CONFIG_CHANGED'),
+    func.count().filter(AuditLog.action.in_(GAME_EVENT_ACTIONS)),
+).select_from(AuditLog)
+
+# (last hour, last 24h); cutoffs are bound per call so SQLite compares
+# timestamps rather than doing arithmetic on CURRENT_TIMESTAMP
+_AUDIT_WINDOW_COUNTS_STMT = select(
+    func.count().filter(
+        AuditLog.created_at >= bindparam("hour_ago", type_=AuditLog.created_at.type)
+    ),
+    func.count().filter(
+        AuditLog.created_at >= bindparam("day_ago", type_=AuditLog.created_at.type)
+    ),
+).select_from(AuditLog)
+
+_AUDIT_ACTION_COUNTS_STMT = select(AuditLog.action, func.count()).group_by(AuditLog.action)
+
+# (FIXED_HOUSE_EDGE sessions, DYNAMIC sessions)
+_GAMES_BY_ALGORITHM_STMT = select(
+    func.count().filter(GameSession.algorithm_used == 'FIXED_HOUSE_EDGE'),
+    func.count().filter(GameSession.algorithm_used == 'DYNAMIC'),
+).select_from(GameSession)
+
+_RECENT_GAME_EVENTS_STMT = (
+    select(AuditLog.created_at, AuditLog.action)
+    .where(AuditLog.action.in_(GAME_EVENT_ACTIONS))
+    .order_by(desc(AuditLog.created_at))
+    .limit(10)
+)
+
+
+async def _fetch_rows(session_maker, stmt, params=None):
+    """Run a read-only statement on its own pooled session and return all rows"""
+    async with session_maker() as session:
+        result = await session.execute(stmt, params)
+        return result.all()
 
 
 @router.message(Command('audit_logs'))
@@ -27,19 +118,9 @@ async def view_audit_logs(message: Message, session_maker):
     """Show audit logs menu"""
     
     async with session_maker() as session:
-        # Count different types of audit logs
-        total_logs = await session.execute(select(func.count(AuditLog.id)))
-        total_count = total_logs.scalar() or 0
-        
-        algo_logs = await session.execute(
-            select(func.count(AuditLog.id)).where(AuditLog.action == 'ALGORITHM_CONFIG_CHANGED')
-        )
-        algo_count = algo_logs.scalar() or 0
-        
-        game_logs = await session.execute(
-            select(func.count(AuditLog.id)).where(AuditLog.action.in_(['GAME_STARTED', 'GAME_COMPLETED']))
-        )
-        game_count = game_logs.scalar() or 0
+        # Count different types of audit logs in one pass
+        result = await session.execute(_AUDIT_COUNTS_STMT)
+        total_count, algo_count, game_count = result.one()
         
         text = f"""📋 *Audit Log Dashboard*
 
@@ -67,78 +148,91 @@ async def view_audit_logs(message: Message, session_maker):
         await message.answer(text, reply_markup=keyboard, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "audit_view_recent")
+@router.callback_query((F.data == "audit_view_recent") | F.data.startswith("audit_recent_older_"))
 @admin_required
 async def view_recent_logs(query: CallbackQuery, session_maker):
-    """View recent audit logs"""
+    """View recent audit logs (keyset pages on created_at, id)"""
     
     async with session_maker() as session:
-        logs_query = (
-            select(AuditLog)
-            .order_by(desc(AuditLog.created_at))
-            .limit(20)
-        )
-        result = await session.execute(logs_query)
-        logs = result.scalars().all()
-        
-        text = "📋 *Recent Audit Logs* (Last 20)\n\n"
+        if query.data == "audit_view_recent":
+            result = await session.execute(_RECENT_LOGS_STMT)
+            parts = [f"📋 *Recent Audit Logs* (Last {RECENT_LOGS_PER_PAGE})\n\n"]
+        else:
+            # audit_recent_older_<micros>_<id>
+            cursor_ts, cursor_id = decode_cursor(query.data[len("audit_recent_older_"):])
+            result = await session.execute(
+                _RECENT_LOGS_OLDER_STMT, {"cursor_ts": cursor_ts, "cursor_id": cursor_id}
+            )
+            parts = ["📋 *Older Audit Logs*\n\n"]
+        
+        # The extra row only tells whether an older page exists
+        logs = result.all()
+        has_older = len(logs) > RECENT_LOGS_PER_PAGE
+        logs = logs[:RECENT_LOGS_PER_PAGE]
         
         if not logs:
-            text += "No logs recorded yet"
+            parts.append("No logs recorded yet")
         else:
-            for log in logs:
-                timestamp = log.created_at.strftime('%H:%M:%S')
-                action = log.action.replace('_', ' ').title()
-                text += f"• `{timestamp}` - {action}\n"
-                if log.admin_id:
-                    text += f"  👤 Admin: `{log.admin_id}`\n"
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📋 View Full Details", callback_data="audit_full_details")],
-            [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+            for created_at, action, admin_id, _ in logs:
+                parts.append(f"• `{created_at.strftime('%H:%M:%S')}` - {action.replace('_', ' ').title()}\n")
+                if admin_id:
+                    parts.append(f"  👤 Admin: `{admin_id}`\n")
+        
+        rows = [[InlineKeyboardButton(text="📋 View Full Details", callback_data="audit_full_details")]]
+        if has_older:
+            rows.append([InlineKeyboardButton(
+                text="▶️ Older",
+                callback_data=f"audit_recent_older_{encode_cursor(logs[-1].created_at, logs[-1].id)}"
+            )])
+        rows.append([InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")])
+        keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+        
+        await query.message.edit_text("".join(parts), reply_markup=keyboard, parse_mode='Markdown')
 
 
-@router.callback_query(F.data == "audit_algo_changes")
+@router.callback_query((F.data == "audit_algo_changes") | F.data.startswith("audit_algo_older_"))
 @admin_required
 async def view_algo_changes(query: CallbackQuery, session_maker):
-    """View algorithm configuration changes"""
+    """View algorithm configuration changes (keyset pages on created_at, id)"""
     
     async with session_maker() as session:
-        logs_query = (
-            select(AuditLog)
-            .where(AuditLog.action == 'ALGORITHM_CONFIG_CHANGED')
-            .order_by(desc(AuditLog.created_at))
-            .limit(15)
-        )
-        result = await session.execute(logs_query)
-        logs = result.scalars().all()
+        if query.data == "audit_algo_changes":
+            result = await session.execute(_ALGO_CHANGES_STMT)
+        else:
+            # audit_algo_older_<micros>_<id>
+            cursor_ts, cursor_id = decode_cursor(query.data[len("audit_algo_older_"):])
+            result = await session.execute(
+                _ALGO_CHANGES_OLDER_STMT, {"cursor_ts": cursor_ts, "cursor_id": cursor_id}
+            )
+        
+        logs = result.all()
+        has_older = len(logs) > ALGO_CHANGES_PER_PAGE
+        logs = logs[:ALGO_CHANGES_PER_PAGE]
         
-        text = "⚙️ *Algorithm Configuration Changes*\n\n"
+        parts = ["⚙️ *Algorithm Configuration Changes*\n\n"]
         
         if not logs:
-            text += "No algorithm changes recorded"
+            parts.append("No algorithm changes recorded")
         else:
-            for log in logs:
-                details = log.details or {}
-                old_algo = details.get('old_algorithm', '?')
-                new_algo = details.get('new_algorithm', '?')
-                timestamp = log.created_at.strftime('%Y-%m-%d %H:%M')
-                
-                text += f"• `{timestamp}`\n"
-                text += f"  `{old_algo}` → `{new_algo}`\n"
-                if log.admin_id:
-                    text += f"  👤 By: `{log.admin_id}`\n"
-                text += "\n"
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Download Full Log", callback_data="audit_download_algo_log")],
-            [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+            for created_at, admin_id, old_algo, new_algo, _ in logs:
+                parts.append(
+                    f"• `{created_at.strftime('%Y-%m-%d %H:%M')}`\n"
+                    f"  `{old_algo or '?'}` → `{new_algo or '?'}`\n"
+                )
+                if admin_id:
+                    parts.append(f"  👤 By: `{admin_id}`\n")
+                parts.append("\n")
+        
+        rows = [[InlineKeyboardButton(text="📥 Download Full Log", callback_data="audit_download_algo_log")]]
+        if has_older:
+            rows.append([InlineKeyboardButton(
+                text="▶️ Older",
+                callback_data=f"audit_algo_older_{encode_cursor(logs[-1].created_at, logs[-1].id)}"
+            )])
+        rows.append([InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")])
+        keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+        
+        await query.message.edit_text("".join(parts), reply_markup=keyboard, parse_mode='Markdown')
 
 
 @router.callback_query(F.data == "audit_game_events")
@@ -146,51 +240,34 @@ async def view_algo_changes(query: CallbackQuery, session_maker):
 async def view_game_events(query: CallbackQuery, session_maker):
     """View game-related audit events"""
     
-    async with session_maker() as session:
-        # Count games by algorithm
-        fixed_games = await session.execute(
-            select(func.count(GameSession.id)).where(GameSession.algorithm_used == 'FIXED_HOUSE_EDGE')
-        )
-        fixed_count = fixed_games.scalar() or 0
-        
-        dynamic_games = await session.execute(
-            select(func.count(GameSession.id)).where(GameSession.algorithm_used == 'DYNAMIC')
-        )
-        dynamic_count = dynamic_games.scalar() or 0
-        
-        # Get recent game logs
-        logs_query = (
-            select(AuditLog)
-            .where(AuditLog.action.in_(['GAME_STARTED', 'GAME_COMPLETED']))
-            .order_by(desc(AuditLog.created_at))
-            .limit(10)
-        )
-        result = await session.execute(logs_query)
-        logs = result.scalars().all()
-        
-        text = f"""🎮 *Game Events*
+    # Games by algorithm and recent game logs hit different tables; run them concurrently
+    (counts,), logs = await asyncio.gather(
+        _fetch_rows(session_maker, _GAMES_BY_ALGORITHM_STMT),
+        _fetch_rows(session_maker, _RECENT_GAME_EVENTS_STMT),
+    )
+    fixed_count, dynamic_count = counts
+    
+    parts = [f"""🎮 *Game Events*
 
 📊 Total Games:
 💎 FIXED_HOUSE_EDGE: `{fixed_count}`
 🧠 DYNAMIC: `{dynamic_count}`
 
 *Recent Events:*
-"""
-        
-        if logs:
-            for log in logs:
-                timestamp = log.created_at.strftime('%H:%M:%S')
-                action = log.action.replace('_', ' ')
-                text += f"• `{timestamp}` - {action}\n"
-        else:
-            text += "No game events recorded"
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📊 Detailed Stats", callback_data="audit_game_stats")],
-            [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+"""]
+    
+    if logs:
+        for created_at, action in logs:
+            parts.append(f"• `{created_at.strftime('%H:%M:%S')}` - {action.replace('_', ' ')}\n")
+    else:
+        parts.append("No game events recorded")
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📊 Detailed Stats", callback_data="audit_game_stats")],
+        [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
+    ])
+    
+    await query.message.edit_text("".join(parts), reply_markup=keyboard, parse_mode='Markdown')
 
 
 @router.callback_query(F.data == "audit_stats")
@@ -198,41 +275,32 @@ async def view_game_events(query: CallbackQuery, session_maker):
 async def view_audit_stats(query: CallbackQuery, session_maker):
     """View audit statistics"""
     
-    async with session_maker() as session:
-        # Count logs by action
-        actions_query = select(AuditLog.action, func.count(AuditLog.id)).group_by(AuditLog.action)
-        result = await session.execute(actions_query)
-        action_counts = result.all()
-        
-        # Time ranges
-        now = datetime.utcnow()
-        hour_ago = now - timedelta(hours=1)
-        day_ago = now - timedelta(days=1)
-        
-        hour_logs = await session.execute(
-            select(func.count(AuditLog.id)).where(AuditLog.created_at >= hour_ago)
-        )
-        hour_count = hour_logs.scalar() or 0
-        
-        day_logs = await session.execute(
-            select(func.count(AuditLog.id)).where(AuditLog.created_at >= day_ago)
-        )
-        day_count = day_logs.scalar() or 0
-        
-        text = "📊 *Audit Statistics*\n\n"
-        text += f"*Time Ranges:*\n"
-        text += f"📌 Last Hour: `{hour_count}`\n"
-        text += f"📌 Last 24h: `{day_count}`\n\n"
-        
-        text += "*Events by Type:*\n"
-        for action, count in action_counts:
-            text += f"• {action}: `{count}`\n"
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
-        ])
-        
-        await query.message.edit_text(text, reply_markup=keyboard, parse_mode='Markdown')
+    # Counts by action and the time-range counts (both in one pass) run concurrently
+    now = datetime.now(timezone.utc)
+    action_counts, ((hour_count, day_count),) = await asyncio.gather(
+        _fetch_rows(session_maker, _AUDIT_ACTION_COUNTS_STMT),
+        _fetch_rows(
+            session_maker,
+            _AUDIT_WINDOW_COUNTS_STMT,
+            {"hour_ago": now - timedelta(hours=1), "day_ago": now - timedelta(days=1)},
+        ),
+    )
+    
+    parts = [f"""📊 *Audit Statistics*
+
+*Time Ranges:*
+📌 Last Hour: `{hour_count}`
+📌 Last 24h: `{day_count}`
+
+*Events by Type:*
+"""]
+    parts.extend(f"• {action}: `{count}`\n" for action, count in action_counts)
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔙 Back", callback_data="audit_back_menu")]
+    ])
+    
+    await query.message.edit_text("".join(parts), reply_markup=keyboard, parse_mode='Markdown')
 
 
 @router.callback_query(F.data == "audit_export_report")
@@ -242,48 +310,54 @@ async def export_audit_report(query: CallbackQuery, session_maker):
     
     async with session_maker() as session:
         logs_query = (
-            select(AuditLog)
+            select(
+                AuditLog.created_at,
+                AuditLog.action,
+                AuditLog.admin_id,
+                AuditLog.details,
+                AuditLog.ip_address,
+            )
             .order_by(desc(AuditLog.created_at))
-            .limit(1000)  # Export last 1000 logs
+            .limit(EXPORT_MAX_ROWS)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
         )
-        result = await session.execute(logs_query)
-        logs = result.scalars().all()
         
-        # Create CSV
-        csv_buffer = io.StringIO()
-        writer = csv.writer(csv_buffer)
+        # Stream rows straight into a UTF-8 buffer (no str copy to encode afterwards)
+        csv_buffer = io.BytesIO()
+        csv_text = io.TextIOWrapper(csv_buffer, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(csv_text)
         
         # Headers
         writer.writerow(['Timestamp', 'Action', 'Admin ID', 'Details', 'IP Address'])
         
         # Data
-        for log in logs:
-            details_json = json.dumps(log.details or {})
+        exported = 0
+        result = await session.stream(logs_query)
+        async for created_at, action, admin_id, details, ip_address in result:
             writer.writerow([
-                log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                log.action,
-                log.admin_id or 'N/A',
-                details_json,
-                log.ip_address or 'N/A'
+                created_at.isoformat(' ', 'seconds')[:19],
+                action,
+                admin_id or 'N/A',
+                json_dumps(details) if details else '{}',
+                ip_address or 'N/A'
             ])
+            exported += 1
         
-        # Create file
         csv_data = csv_buffer.getvalue()
-        csv_buffer.close()
+        csv_text.close()
         
         # Send as document
         file_name = f"audit_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        # Convert string to bytes and create InputFile
         from aiogram.types import BufferedInputFile
         file = BufferedInputFile(
-            file_data=csv_data.encode('utf-8'),
+            file_data=csv_data,
             filename=file_name
         )
         
         await query.message.answer_document(
             document=file,
-            caption=f"📊 Audit Report\n\n✅ Exported {len(logs)} records"
+            caption=f"📊 Audit Report\n\n✅ Exported {exported} records"
         )
         
         await query.answer("Report exported", show_alert=False)
@@ -4,16 +4,17 @@ Database session management for Telegram handlers
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
-from config import DATABASE_URL
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 # Create async engine
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=3600,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
 )
 
 # Create async session factory
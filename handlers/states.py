@@ -35,3 +35,10 @@ class AdminStates(StatesGroup):
     waiting_for_amount = State()
     waiting_for_reason = State()
     waiting_for_confirmation = State()
+    # Advanced dashboard (handlers/admin_advanced.py)
+    searching_user = State()
+    viewing_user = State()
+    changing_user_currency = State()
+    changing_user_balance = State()
+    viewing_affiliate_stats = State()
+    approving_commission = State()
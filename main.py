@@ -11,7 +11,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from config import DATABASE_URL
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE
 import models
 Base = models.Base
 import bot
@@ -45,8 +45,15 @@ async def init_database():
                 echo=False
             )
         else:
-            # PostgreSQL configuration
-            engine = create_async_engine(db_url, echo=False)
+            # PostgreSQL configuration - pooled connections shared by all handlers
+            engine = create_async_engine(
+                db_url,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+                echo=False
+            )
         
         # Create tables
         async with engine.begin() as conn:
@@ -0,0 +1,8 @@
+-- Admin users list: keyset pagination on (created_at DESC, id DESC)
+-- Migration: 004_add_users_keyset_index.sql
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_users_created_id ON users(created_at, id);
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Audit log "recent changes" views: WHERE action = ... ORDER BY created_at DESC LIMIT n
+-- Migration: 005_add_audit_log_action_index.sql
+-- Matches Index('idx_audit_log_action_created') on models.AuditLog; a btree
+-- is scanned backwards for DESC, so no separate descending index is needed.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_action_created ON audit_logs(action, created_at);
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- Audit log action groups: equality filter instead of action LIKE 'AGENT_ASSIGNED_%'
+-- Migration: 006_add_audit_log_category.sql
+
+BEGIN;
+
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS category VARCHAR(32);
+
+UPDATE audit_logs
+SET category = 'AGENT_ASSIGNMENT'
+WHERE category IS NULL AND action LIKE 'AGENT_ASSIGNED_%';
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_category_created ON audit_logs(category, created_at);
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Algorithm stats / audit views: counts by algorithm_used (and result for win rates)
+-- Migration: 007_add_game_algorithm_indexes.sql
+-- audit_logs (action, created_at) and (created_at) are covered by 005 and 001.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_game_sessions_algorithm ON game_sessions(algorithm_used);
+CREATE INDEX IF NOT EXISTS idx_game_rounds_algorithm_result ON game_rounds(algorithm_used, result);
+
+COMMIT;
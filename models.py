@@ -166,6 +166,17 @@ class User(Base):
     outbox_messages = relationship("Outbox", back_populates="user", cascade="all, delete-orphan")
     announcement_deliveries = relationship("AnnouncementDelivery", back_populates="user", cascade="all, delete-orphan")
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
+    withdrawal_addresses = relationship(
+        "WithdrawalAddress",
+        foreign_keys="WithdrawalAddress.user_id",
+        order_by="WithdrawalAddress.created_at.desc()",
+        viewonly=True
+    )
+    
+    __table_args__ = (
+        # Keyset pagination of the admin users list: (created_at DESC, id DESC)
+        Index('idx_users_created_id', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, telegram_id={self.telegram_id}, customer_code={self.customer_code})>"
@@ -457,6 +468,9 @@ class AuditLog(Base):
     # What action was performed
     action: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     
+    # Action group for equality filters (e.g. AGENT_ASSIGNMENT for AGENT_ASSIGNED_*)
+    category: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    
     # What was the target (transaction, user, etc.)
     target_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     target_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -481,6 +495,7 @@ class AuditLog(Base):
     __table_args__ = (
         Index('idx_audit_log_admin_created', 'admin_id', 'created_at'),
         Index('idx_audit_log_action_created', 'action', 'created_at'),
+        Index('idx_audit_log_category_created', 'category', 'created_at'),
         Index('idx_audit_log_target', 'target_type', 'target_id'),
     )
     
@@ -801,6 +816,7 @@ class GameSession(Base):
     __table_args__ = (
         Index('idx_game_sessions_user_created', 'user_id', 'started_at'),
         Index('idx_game_sessions_type_created', 'game_type', 'started_at'),
+        Index('idx_game_sessions_algorithm', 'algorithm_used'),
     )
     
     def __repr__(self):
@@ -837,6 +853,7 @@ class GameRound(Base):
     __table_args__ = (
         Index('idx_game_rounds_session', 'session_id'),
         Index('idx_game_rounds_user_created', 'user_id', 'created_at'),
+        Index('idx_game_rounds_algorithm_result', 'algorithm_used', 'result'),
     )
     
     def __repr__(self):
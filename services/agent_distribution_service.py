@@ -12,7 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 
 from models import Agent, Outbox, OutboxStatus, AgentStatus, AuditLog
-from services.system_settings_service import SystemSettingsService, SettingKey
+from services.system_settings_service import SystemSettingsService, SettingKey, get_agent_distribution_mode
 from services.audit_log_service import AuditLogService, AuditAction
 
 
@@ -317,11 +317,7 @@ class AgentDistributionService:
         """
         
         # Get current distribution mode
-        mode = await SystemSettingsService.get_setting(
-            session,
-            SettingKey.AGENT_DISTRIBUTION_MODE,
-            default='MANUAL'
-        )
+        mode = await get_agent_distribution_mode(session)
         
         # Get strategy
         strategy = AgentDistributionService._strategies.get(mode)
@@ -44,6 +44,12 @@ class AuditAction:
     PREDICTIVE_INFERENCE_RUN = "PREDICTIVE_INFERENCE_RUN"
 
 
+class AuditCategory:
+    """Action groups stored in AuditLog.category"""
+    
+    AGENT_ASSIGNMENT = "AGENT_ASSIGNMENT"  # AGENT_ASSIGNED_*
+
+
 class AuditLogService:
     """Service for logging audit events"""
     
@@ -86,6 +92,7 @@ class AuditLogService:
         audit_entry = AuditLog(
             admin_id=admin_id,
             action=action,
+            category=AuditCategory.AGENT_ASSIGNMENT,
             target_type='REQUEST',
             target_id=request_id,
             details={
@@ -141,8 +148,8 @@ class AuditLogService:
             ip_address=ip_address,
         )
         
+        # No flush: written together with the setting change on the caller's commit
         session.add(audit_entry)
-        await session.flush()
         
         return audit_entry
     
@@ -191,8 +198,8 @@ class AuditLogService:
             ip_address=ip_address,
         )
         
+        # No flush: written together with the setting change on the caller's commit
         session.add(audit_entry)
-        await session.flush()
         
         return audit_entry
     
@@ -4,16 +4,25 @@ SystemSettings Service - Dynamic configuration management
 Handles reading, updating, and caching of all system settings
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 from decimal import Decimal
 from datetime import datetime, timezone
+import asyncio
 import json
 
-from sqlalchemy import select
+from sqlalchemy import select, event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from config import SETTINGS_CACHE_TTL
 from models import SystemSettings, AuditLog
 
+# Cached marker for "no such row", so absent settings are cached too
+_MISSING = object()
+
+# session.info key: settings written in the session's open transaction
+_DIRTY_KEYS = 'system_settings_dirty_keys'
+
 
 class SettingKey:
     """Centralized definition of all setting keys"""
@@ -42,9 +51,16 @@ class SettingKey:
 class SystemSettingsService:
     """Service for managing system-wide configuration"""
     
-    # In-memory cache (TTL: 5 minutes)
+    # In-memory cache (TTL: SETTINGS_CACHE_TTL); entries are dropped after the
+    # commit (or rollback) of any session that wrote the key, see _write_setting
     _cache: Dict[str, tuple[Any, datetime]] = {}
-    CACHE_TTL_SECONDS = 300
+    CACHE_TTL_SECONDS = SETTINGS_CACHE_TTL
+    
+    # key -> future of the in-flight load, so concurrent misses share one query
+    _loading: Dict[str, asyncio.Future] = {}
+    
+    # Bumped by every invalidation; a load that started before one is not cached
+    _cache_version = 0
     
     @staticmethod
     async def get_setting(
@@ -66,29 +82,132 @@ class SystemSettingsService:
             Parsed setting value or default
         """
         
+        # A key written in this session's open transaction is read straight
+        # from the database and never cached (it may still roll back)
+        if not use_cache or key in session.info.get(_DIRTY_KEYS, ()):
+            value = await SystemSettingsService._load_setting(session, key)
+            return default if value is _MISSING else value
+        
         # Check cache first
-        if use_cache and key in SystemSettingsService._cache:
+        if key in SystemSettingsService._cache:
             value, cached_at = SystemSettingsService._cache[key]
             age = (datetime.now(timezone.utc) - cached_at).total_seconds()
             if age < SystemSettingsService.CACHE_TTL_SECONDS:
-                return value
+                return default if value is _MISSING else value
         
-        # Query database
-        query = select(SystemSettings).where(SystemSettings.key == key)
+        value = await SystemSettingsService._load_shared(session, key)
+        return default if value is _MISSING else value
+    
+    @staticmethod
+    async def _load_setting(session: AsyncSession, key: str) -> Any:
+        """Query and parse one setting, or _MISSING if there is no row"""
+        
+        query = select(SystemSettings.value, SystemSettings.data_type).where(SystemSettings.key == key)
         result = await session.execute(query)
-        setting = result.scalar_one_or_none()
+        row = result.first()
         
-        if setting is None:
-            return default
+        if row is None:
+            return _MISSING
         
         # Parse value based on data_type
-        parsed_value = SystemSettingsService._parse_value(setting.value, setting.data_type)
+        return SystemSettingsService._parse_value(row.value, row.data_type)
+    
+    @staticmethod
+    async def _load_shared(session: AsyncSession, key: str) -> Any:
+        """
+        Load a setting into the cache (single flight per key)
+        
+        Concurrent misses for the same key await the first caller's query;
+        misses for different keys do not wait on each other.
+        """
+        
+        while True:
+            loading = SystemSettingsService._loading.get(key)
+            if loading is None:
+                break
+            try:
+                return await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                if not loading.cancelled():
+                    raise  # this caller itself was cancelled
+                # The loading caller was cancelled; take over the load
+        
+        future = asyncio.get_running_loop().create_future()
+        SystemSettingsService._loading[key] = future
+        version = SystemSettingsService._cache_version
+        try:
+            value = await SystemSettingsService._load_setting(session, key)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        except BaseException:
+            future.cancel()  # waiters take over instead of hanging
+            raise
+        finally:
+            SystemSettingsService._loading.pop(key, None)
+        
+        future.set_result(value)
+        # An invalidation while the query ran may mean it read the old value
+        if version == SystemSettingsService._cache_version:
+            SystemSettingsService._cache[key] = (value, datetime.now(timezone.utc))
+        return value
+    
+    @staticmethod
+    async def get_many(
+        session: AsyncSession,
+        keys: Iterable[str],
+        defaults: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Get several setting values with a single query
         
-        # Cache it
-        if use_cache:
-            SystemSettingsService._cache[key] = (parsed_value, datetime.now(timezone.utc))
+        Args:
+            session: Database session
+            keys: Setting keys to read
+            defaults: Per-key defaults for settings that are not found
+            use_cache: Use in-memory cache
+            
+        Returns:
+            Dict of key -> parsed value (or default)
+        """
+        
+        defaults = defaults or {}
+        values: Dict[str, Any] = {}
+        missing = []
+        now = datetime.now(timezone.utc)
+        dirty = session.info.get(_DIRTY_KEYS, ())
+        use_cache = use_cache and not dirty
+        version = SystemSettingsService._cache_version
+        
+        for key in keys:
+            cached = SystemSettingsService._cache.get(key) if use_cache else None
+            if cached and (now - cached[1]).total_seconds() < SystemSettingsService.CACHE_TTL_SECONDS:
+                values[key] = defaults.get(key) if cached[0] is _MISSING else cached[0]
+            else:
+                missing.append(key)
+        
+        if missing:
+            query = (
+                select(SystemSettings.key, SystemSettings.value, SystemSettings.data_type)
+                .where(SystemSettings.key.in_(missing))
+            )
+            result = await session.execute(query)
+            for key, value, data_type in result.all():
+                parsed_value = SystemSettingsService._parse_value(value, data_type)
+                values[key] = parsed_value
+                if use_cache and version == SystemSettingsService._cache_version:
+                    SystemSettingsService._cache[key] = (parsed_value, now)
         
-        return parsed_value
+        for key in missing:
+            if key not in values:
+                values[key] = defaults.get(key)
+                # Remember absent rows too, as get_setting does
+                if use_cache and version == SystemSettingsService._cache_version:
+                    SystemSettingsService._cache[key] = (_MISSING, now)
+        
+        return values
     
     @staticmethod
     async def set_setting(
@@ -120,6 +239,64 @@ class SystemSettingsService:
         result = await session.execute(query)
         setting = result.scalar_one_or_none()
         
+        return await SystemSettingsService._write_setting(
+            session, setting, key, value, category, description, data_type, admin_id
+        )
+    
+    @staticmethod
+    async def swap_setting(
+        session: AsyncSession,
+        key: str,
+        value: Any,
+        category: Optional[str] = None,
+        description: Optional[str] = None,
+        data_type: Optional[str] = None,
+        admin_id: Optional[int] = None,
+    ) -> Any:
+        """
+        Set a setting value and return the value it replaced
+        
+        The row is read with SELECT ... FOR UPDATE, so the returned value is
+        exactly what this write overwrote, even with concurrent admins.
+        
+        Args:
+            Same as set_setting
+            
+        Returns:
+            Previous parsed value, or None if the setting was created.
+            When it already equals value nothing is written.
+        """
+        
+        query = select(SystemSettings).where(SystemSettings.key == key).with_for_update()
+        result = await session.execute(query)
+        setting = result.scalar_one_or_none()
+        
+        previous = (
+            SystemSettingsService._parse_value(setting.value, setting.data_type)
+            if setting else None
+        )
+        if setting is not None and setting.value == str(value):
+            # No-op: leave the row (and updated_at/updated_by) untouched
+            return previous
+        
+        await SystemSettingsService._write_setting(
+            session, setting, key, value, category, description, data_type, admin_id
+        )
+        return previous
+    
+    @staticmethod
+    async def _write_setting(
+        session: AsyncSession,
+        setting: Optional[SystemSettings],
+        key: str,
+        value: Any,
+        category: Optional[str],
+        description: Optional[str],
+        data_type: Optional[str],
+        admin_id: Optional[int],
+    ) -> SystemSettings:
+        """Update the loaded setting row (or create it) in the session"""
+        
         # Convert value to string for storage
         str_value = str(value)
         
@@ -146,11 +323,11 @@ class SystemSettingsService:
             )
             session.add(setting)
         
-        await session.flush()
+        # No flush: the next query autoflushes, or the caller's commit writes it
+        # in the same batch as its audit entry
         
-        # Invalidate cache
-        if key in SystemSettingsService._cache:
-            del SystemSettingsService._cache[key]
+        # Invalidate cache once this transaction ends (see _invalidate_written_settings)
+        session.info.setdefault(_DIRTY_KEYS, set()).add(key)
         
         return setting
     
@@ -225,6 +402,7 @@ class SystemSettingsService:
         Args:
             key: Specific key to invalidate, or None for all
         """
+        SystemSettingsService._cache_version += 1
         if key:
             if key in SystemSettingsService._cache:
                 del SystemSettingsService._cache[key]
@@ -232,6 +410,14 @@ class SystemSettingsService:
             SystemSettingsService._cache.clear()
 
 
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_written_settings(session: Session) -> None:
+    """Drop cached values of settings written in the transaction that just ended"""
+    for key in session.info.pop(_DIRTY_KEYS, ()):
+        SystemSettingsService.invalidate_cache(key)
+
+
 # ✅ Helper functions for specific settings
 
 async def get_agent_distribution_mode(session: AsyncSession) -> str:
@@ -243,6 +429,19 @@ async def get_agent_distribution_mode(session: AsyncSession) -> str:
     )
 
 
+async def get_agent_distribution_settings(session: AsyncSession) -> tuple[str, bool]:
+    """Get distribution mode and enabled flag in one query"""
+    settings = await SystemSettingsService.get_many(
+        session,
+        [SettingKey.AGENT_DISTRIBUTION_MODE, SettingKey.AGENT_DISTRIBUTION_ENABLED],
+        defaults={
+            SettingKey.AGENT_DISTRIBUTION_MODE: 'MANUAL',  # Safe default
+            SettingKey.AGENT_DISTRIBUTION_ENABLED: False,  # Disabled by default
+        },
+    )
+    return settings[SettingKey.AGENT_DISTRIBUTION_MODE], bool(settings[SettingKey.AGENT_DISTRIBUTION_ENABLED])
+
+
 async def get_game_algorithm_mode(session: AsyncSession) -> str:
     """Get current game algorithm mode"""
     return await SystemSettingsService.get_setting(
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Callback deduplication middleware
+Drops repeated presses of the same button; kept free of database imports so
+routers can register it without pulling an engine into the bot process
+"""
+
+import asyncio
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from config import CALLBACK_DEDUP_WINDOW
+
+
+class CallbackDedupMiddleware(BaseMiddleware):
+    """
+    Drop repeated presses of the same button by the same user
+    
+    A press arriving within `window` seconds of the previous identical one is
+    answered (to stop the client spinner) and never reaches the handler, so
+    button mashing does not open a session per press.
+    """
+    
+    def __init__(self, window: float = CALLBACK_DEDUP_WINDOW):
+        self.window = window
+        self._last: Dict[tuple, float] = {}
+    
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        now = asyncio.get_running_loop().time()
+        key = (event.from_user.id, event.data)
+        last = self._last.get(key)
+        if last is not None and now - last < self.window:
+            await event.answer()
+            return None
+        
+        if len(self._last) > 10000:
+            # Forget presses that can no longer suppress anything
+            self._last = {k: t for k, t in self._last.items() if now - t < self.window}
+        self._last[key] = now
+        return await handler(event, data)
@@ -363,6 +363,52 @@ def get_pagination_keyboard(base_callback: str, current_page: int,
     
     return builder.as_markup()
 
+def get_cursor_pagination_keyboard(base_callback: str, current_page: int, total_pages: int,
+                                   prev_cursor: Optional[str], next_cursor: Optional[str],
+                                   language: str = "ar") -> InlineKeyboardMarkup:
+    """Create keyset pagination keyboard (cursors are embedded in callback data)"""
+    builder = InlineKeyboardBuilder()
+    
+    buttons = []
+    
+    # Previous button
+    if prev_cursor:
+        buttons.append(
+            InlineKeyboardButton(
+                text="◀️",
+                callback_data=f"{base_callback}_before_{current_page - 1}_{prev_cursor}"
+            )
+        )
+    
+    # Current page indicator
+    buttons.append(
+        InlineKeyboardButton(
+            text=f"{current_page + 1}/{total_pages}",
+            callback_data="noop"
+        )
+    )
+    
+    # Next button
+    if next_cursor:
+        buttons.append(
+            InlineKeyboardButton(
+                text="▶️",
+                callback_data=f"{base_callback}_after_{current_page + 1}_{next_cursor}"
+            )
+        )
+    
+    builder.row(*buttons)
+    
+    # Back button
+    builder.row(
+        InlineKeyboardButton(
+            text=get_text("back", language),
+            callback_data="back_to_admin"
+        )
+    )
+    
+    return builder.as_markup()
+
 def get_broadcast_targeting_keyboard(language: str = "ar") -> InlineKeyboardMarkup:
     """Create broadcast targeting keyboard"""
     builder = InlineKeyboardBuilder()
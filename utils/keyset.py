@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination cursors
+Encodes (created_at, id) positions as compact callback_data strings
+"""
+
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset cursor as '<epoch microseconds>_<id>'"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - _EPOCH) // timedelta(microseconds=1)}_{row_id}"
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    micros, row_id = cursor.split("_")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(row_id)